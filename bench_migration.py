@@ -0,0 +1,140 @@
+"""Benchmark of the migration pipeline on synthetic exports.
+
+Generates an export of the requested size with synth_export.py in a scratch
+directory, then runs every stage there as its own process (ZNUNY_MOUNT points
+the scripts at the scratch directory) and reports per stage the wall time,
+rows/s, CPU time and peak RSS of that process as JSON:
+
+    {"rows": ..., "export_bytes": ..., "generate_seconds": ...,
+     "stages": [{"stage": "prepare_ppe_migration", "seconds": ..., "rows": ...,
+                 "rows_per_s": ..., "cpu_user": ..., "cpu_sys": ...,
+                 "peak_rss_mb": ..., "exit_code": 0}, ...],
+     "total_seconds": ...}
+
+Stages are people_index, every prepare_* script, migrate_export,
+fix_tools_import and process_notifications, in that order. people_index
+comes first, so the later stages find a fresh People index as they would on
+a second run.
+
+Usage: python3 bench_migration.py --rows 100000 [--notifications N]
+                                  [--stages a,b,...] [--keep DIR] [--output FILE]
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from synth_export import write_export, write_notifications
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def stages():
+    # (stage, script and arguments, what its rows/s is counted in), every
+    # prepare_* script included
+    prepare = sorted(f[:-3] for f in os.listdir(SCRIPT_DIR) if f.startswith('prepare_') and f.endswith('.py'))
+    return ([('people_index', ['people_index.py', '--rebuild'], 'export')]
+            + [(name, [f'{name}.py'], 'export') for name in prepare]
+            + [('migrate_export', ['migrate_export.py'], 'export'),
+               ('fix_tools_import', ['fix_tools_import.py'], 'export'),
+               ('process_notifications', ['process_notifications.py'], 'notifications')])
+
+def peak_rss_mb(ru):
+    # ru_maxrss is in KB on Linux and in bytes on macOS
+    if sys.platform == 'darwin':
+        return ru.ru_maxrss / (1 << 20)
+    return ru.ru_maxrss / 1024
+
+def run_stage(name, argv, work_dir, rows):
+    env = dict(os.environ, ZNUNY_MOUNT=work_dir, PYTHONPATH=SCRIPT_DIR)
+    script = os.path.join(SCRIPT_DIR, argv[0])
+    with tempfile.TemporaryFile() as stderr:
+        t0 = time.perf_counter()
+        proc = subprocess.Popen([sys.executable, script] + argv[1:], cwd=work_dir, env=env,
+                                stdout=subprocess.DEVNULL, stderr=stderr)
+        # wait4 gives the resource usage of this child alone
+        _, status, ru = os.wait4(proc.pid, 0)
+        seconds = time.perf_counter() - t0
+        stderr.seek(0)
+        err = stderr.read().decode('utf-8', 'replace')
+    result = {
+        'stage': name,
+        'seconds': round(seconds, 4),
+        'rows': rows,
+        'rows_per_s': round(rows / seconds, 1) if seconds else None,
+        'cpu_user': round(ru.ru_utime, 4),
+        'cpu_sys': round(ru.ru_stime, 4),
+        'peak_rss_mb': round(peak_rss_mb(ru), 1),
+        'exit_code': os.waitstatus_to_exitcode(status),
+    }
+    if result['exit_code']:
+        result['error'] = err.strip().splitlines()[-1] if err.strip() else ''
+    return result
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the migration stages on a synthetic export.")
+    parser.add_argument('--rows', type=int, default=10000, help="records in the synthetic export (10^4 .. 10^7)")
+    parser.add_argument('--notifications', type=int, help="notifications to generate (default: rows / 100)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--stages', help="comma-separated list of stages to run (default: all)")
+    parser.add_argument('--keep', metavar='DIR', help="work in DIR and keep it (default: temporary directory)")
+    parser.add_argument('--output', help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    selected = stages()
+    if args.stages:
+        wanted = set(args.stages.split(','))
+        unknown = wanted - {s[0] for s in selected}
+        if unknown:
+            parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+        selected = [s for s in selected if s[0] in wanted]
+    notifications = args.notifications if args.notifications is not None else max(1, args.rows // 100)
+
+    if args.keep:
+        os.makedirs(args.keep, exist_ok=True)
+        work_dir = os.path.abspath(args.keep)
+    else:
+        work_dir = tempfile.mkdtemp(prefix='bench_migration_')
+
+    try:
+        export = os.path.join(work_dir, 'old_otrs_cmdb_export_v2.csv')
+        t0 = time.perf_counter()
+        write_export(export, args.rows, args.seed)
+        write_notifications(os.path.join(work_dir, 'old_notifications.tsv'), notifications, args.seed)
+        generate_seconds = time.perf_counter() - t0
+
+        counts = {'export': args.rows, 'notifications': notifications}
+        results = []
+        for name, stage_argv, unit in selected:
+            results.append(run_stage(name, stage_argv, work_dir, counts[unit]))
+            print(f"{name}: {results[-1]['seconds']:.2f} s", file=sys.stderr)
+
+        report = {
+            'rows': args.rows,
+            'notifications': notifications,
+            'seed': args.seed,
+            'export_bytes': os.path.getsize(export),
+            'generate_seconds': round(generate_seconds, 4),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'stages': results,
+            'total_seconds': round(sum(r['seconds'] for r in results), 4),
+        }
+    finally:
+        if not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return 1 if any(r['exit_code'] for r in results) else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,387 @@
+"""Bulk load of the import CSVs straight into the Znuny CMDB tables.
+
+Instead of importing the field_mapping.yml outputs class by class through
+the ImportExport UI, every CSV row becomes one config item written with
+plain SQL, as ITSMConfigItem::ConfigItemAdd() / VersionAdd() store it:
+
+  configitem          number, class; last_version_id and the current
+                      deployment / incident state set once the version is in
+  configitem_version  name, definition, deployment and incident state
+  xml_storage         the attributes, flattened the way XMLHash2D() does
+                      ([1]{'Version'}[1]{'Key'}[1]{'Content'} plus a TagKey
+                      row per node), type ITSM::ConfigItem::<class ID>
+
+Every --batch-size CIs are one transaction. The batch is first written as
+plain values to two temporary staging tables (bulk_ci, bulk_attr, a
+multi-row INSERT each), then copied into the CMDB tables by one
+INSERT ... SELECT per table, so the database resolves the IDs set-wise:
+the class, its latest definition, catalog items and the People CI an owner
+refers to are looked up by name, and no ID is allocated here. The same
+statements run on MariaDB and SQLite. GeneralCatalog values hold the item
+ID, CIClassReference values the People CI ID (by CI name), or '' when the
+name is not found; the other types are stored as they are.
+
+Each file is first checked with import_validator.py and not loaded when it
+has errors (--no-validate skips the check). Classes without a definition in
+field_mapping.yml are skipped. The new CIs are numbered
+{number-prefix}-{class}-000001 and so on, each batch after the highest
+number of that prefix and class already in configitem, so a later file of
+the class (*_delta.csv, *_retry.csv) continues the numbering. Loading a file
+twice adds its CIs twice. No configitem_history entries are written, and the
+Znuny cache has to be cleared afterwards (bin/znuny.Console.pl Maint::Cache::Delete).
+
+A load that fails part way keeps the batches committed before the error. It
+is resumed by loading the same file again with --skip N, N the number of its
+rows already loaded: --sqlite prints it with the error; after a --sql file
+stopped the mysql client, it is the number of CIs numbered
+{number-prefix}-{class}-... that the file added.
+
+  --sql FILE     write the statements to FILE, for the mysql client (.gz /
+                 .xz / .zst compressed by its suffix, like the input CSVs)
+  --sqlite DB    run them on an SQLite database; --init-standin first creates
+                 the tables there, with the catalog of the general_catalog
+                 export (id_maps.py), a definition per class and the People
+                 CIs of people_to_import.csv, as a local stand-in for testing
+
+Usage: python3 bulk_loader.py FILE... (--sql OUT | --sqlite DB [--init-standin])
+                              [--class CLS] [--batch-size N] [--number-prefix MIG] [--skip N]
+                              [--user-id 1] [--dialect mysql|sqlite] [--no-validate]
+"""
+import argparse
+import csv
+import itertools
+import os
+import sqlite3
+import sys
+import time
+
+from cmdb_export import BASE_DIR
+from compressed import find_compressed, open_file
+from field_spec import load_spec
+from id_maps import CLASS_CATALOG, load as load_id_maps
+from import_validator import COMMON, REFERENCE_SOURCES, SchemaError, Schemas, class_for_file, validate
+
+BATCH_SIZE = 500
+ATTR_ROWS = 5000
+NUMBER_PREFIX = 'MIG'
+ROOT_USER_ID = 1
+
+class Dialect:
+    # Literal quoting, string concatenation, integer casts, zero padding and
+    # BEGIN, the only SQL that differs
+    def __init__(self, name):
+        if name not in ('mysql', 'sqlite'):
+            raise ValueError(f"unknown dialect {name!r}")
+        self.name = name
+        self.begin = 'START TRANSACTION' if name == 'mysql' else 'BEGIN'
+
+    def quote(self, value):
+        value = value.replace("'", "''")
+        if self.name == 'mysql':
+            value = value.replace('\\', '\\\\')
+        return f"'{value}'"
+
+    def concat(self, a, b):
+        return f"CONCAT({a}, {b})" if self.name == 'mysql' else f"({a} || {b})"
+
+    def integer(self, expr):
+        return f"CAST({expr} AS UNSIGNED)" if self.name == 'mysql' else f"CAST({expr} AS INTEGER)"
+
+    def pad(self, expr, width=6):
+        # expr with leading zeros to width digits, never cut
+        if self.name == 'mysql':
+            return f"LPAD({expr}, GREATEST({width}, CHAR_LENGTH({expr})), '0')"
+        return f"printf('%0{width}d', {expr})"
+
+class PartialLoad(Exception):
+    # A load_file() that failed after some batches were committed
+    def __init__(self, error, loaded):
+        super().__init__(f"{error}; {loaded} rows are loaded, resume with --skip {loaded}")
+        self.loaded = loaded
+
+# Per connection staging tables: a batch is written to them as plain values,
+# keyed by the position in the batch (seq), then numbered and copied into the
+# CMDB tables by set-based INSERT ... SELECTs
+STAGING = [
+    "CREATE TEMPORARY TABLE IF NOT EXISTS bulk_ci (seq INTEGER NOT NULL, number VARCHAR(100),"
+    " name VARCHAR(250) NOT NULL, depl_state VARCHAR(200) NOT NULL, inci_state VARCHAR(200) NOT NULL);",
+    "CREATE TEMPORARY TABLE IF NOT EXISTS bulk_attr (seq INTEGER NOT NULL, tag VARCHAR(250) NOT NULL,"
+    " kind VARCHAR(20) NOT NULL, target VARCHAR(200) NOT NULL, value TEXT NOT NULL);",
+]
+
+# Input.Type -> how bulk_attr.value is resolved
+KINDS = {'GeneralCatalog': 'catalog', 'CIClassReference': 'reference'}
+
+# XMLHash2D() keys: the TagKey rows of the root and Version nodes, and the
+# suffixes of an attribute node's rows
+ROOT_TAGS = [("[1]{'TagKey'}", "[1]"), ("[1]{'Version'}[1]{'TagKey'}", "[1]{'Version'}[1]")]
+CONTENT = "{'Content'}"
+TAG_KEY = "{'TagKey'}"
+
+class Statements:
+    # The SQL of one class: the statements that add a batch of CIs
+    def __init__(self, cls, dialect, user_id=ROOT_USER_ID, number_prefix=NUMBER_PREFIX):
+        self.cls = cls
+        self.q = dialect.quote
+        self.dialect = dialect
+        self.user_id = int(user_id)
+        self.stem = f'{number_prefix}-{cls}-'
+
+    def catalog_id(self, catalog, name):
+        # catalog and name are SQL expressions
+        return f"(SELECT id FROM general_catalog WHERE general_catalog_class = {catalog} AND name = {name})"
+
+    def number(self):
+        # SQL of bulk_ci.number: the stem and seq after the highest number
+        # with the stem in configitem (LIKE, so the unique index is used)
+        d, stem = self.dialect, self.stem
+        pattern = stem.replace('!', '!!').replace('%', '!%').replace('_', '!_') + '%'
+        last = (f"(SELECT COALESCE(MAX({d.integer(f'SUBSTR(configitem_number, {len(stem) + 1})')}), 0)"
+                f" FROM configitem WHERE configitem_number LIKE {self.q(pattern)} ESCAPE '!')")
+        return d.concat(self.q(stem), d.pad(f"({last} + seq)"))
+
+    def batch(self, items):
+        # items: (name, depl_state, inci_state, [(key, spec, value)]).
+        # Returns the statements that add them.
+        q, now, user = self.q, 'current_timestamp', self.user_id
+        cis, attrs = [], []
+        for n, (name, depl_state, inci_state, values) in enumerate(items, 1):
+            cis.append(f"({n}, {q(name)}, {q(depl_state)}, {q(inci_state)})")
+            for tag, value in ROOT_TAGS:
+                attrs.append(f"({n}, {q(tag)}, '', '', {q(value)})")
+            for key, spec, value in values:
+                node = f"[1]{{'Version'}}[1]{{'{key}'}}[1]"
+                kind = KINDS.get(spec.get('Type'), '') if value else ''
+                target = spec.get('Class') if kind == 'catalog' else spec.get('ReferencedCIClassName') if kind else ''
+                attrs.append(f"({n}, {q(node + CONTENT)}, '{kind}', {q(target or '')}, {q(value)})")
+                attrs.append(f"({n}, {q(node + TAG_KEY)}, '', '', {q(node)})")
+        class_id = self.catalog_id(q(CLASS_CATALOG), q(self.cls))
+        reference = (f"(SELECT MAX(rc.id) FROM configitem rc JOIN configitem_version rv ON rv.id = rc.last_version_id"
+                     f" WHERE rc.class_id = {self.catalog_id(q(CLASS_CATALOG), 'a.target')} AND rv.name = a.value)")
+        latest = "FROM configitem_version WHERE configitem_id = configitem.id ORDER BY id DESC LIMIT 1"
+        statements = ["DELETE FROM bulk_ci;", "DELETE FROM bulk_attr;",
+                      "INSERT INTO bulk_ci (seq, name, depl_state, inci_state) VALUES\n" + ',\n'.join(cis) + ';']
+        for i in range(0, len(attrs), ATTR_ROWS):
+            statements.append("INSERT INTO bulk_attr (seq, tag, kind, target, value) VALUES\n"
+                              + ',\n'.join(attrs[i:i + ATTR_ROWS]) + ';')
+        return statements + [
+            f"UPDATE bulk_ci SET number = {self.number()};",
+            "INSERT INTO configitem (configitem_number, class_id, create_time, create_by, change_time, change_by)"
+            f" SELECT number, {class_id}, {now}, {user}, {now}, {user} FROM bulk_ci;",
+            "INSERT INTO configitem_version (configitem_id, name, definition_id, depl_state_id, inci_state_id,"
+            " create_time, create_by)"
+            f" SELECT c.id, b.name, (SELECT MAX(id) FROM configitem_definition WHERE class_id = c.class_id),"
+            f" {self.catalog_id(q(COMMON['DeplState']['Class']), 'b.depl_state')},"
+            f" {self.catalog_id(q(COMMON['InciState']['Class']), 'b.inci_state')}, {now}, {user}"
+            " FROM bulk_ci b JOIN configitem c ON c.configitem_number = b.number;",
+            "UPDATE configitem SET"
+            f" last_version_id = (SELECT id {latest}),"
+            f" cur_depl_state_id = (SELECT depl_state_id {latest}),"
+            f" cur_inci_state_id = (SELECT inci_state_id {latest})"
+            " WHERE configitem_number IN (SELECT number FROM bulk_ci);",
+            "INSERT INTO xml_storage (xml_type, xml_key, xml_content_key, xml_content_value)"
+            f" SELECT {self.dialect.concat(q('ITSM::ConfigItem::'), 'c.class_id')}, c.last_version_id, a.tag,"
+            f" CASE a.kind WHEN 'catalog' THEN COALESCE({self.catalog_id('a.target', 'a.value')}, '')"
+            f" WHEN 'reference' THEN COALESCE({reference}, '') ELSE a.value END"
+            " FROM bulk_attr a JOIN bulk_ci b ON b.seq = a.seq JOIN configitem c ON c.configitem_number = b.number;",
+        ]
+
+def read_items(path, columns, definition, skip=0):
+    # (name, depl_state, inci_state, attrs) per CSV row after the first skip;
+    # attrs are the columns whose key is in the class definition
+    index = {key: i for i, key in reversed(list(enumerate(columns))) if key}
+    for key in ('Name', 'DeplState', 'InciState'):
+        if key not in index:
+            raise SchemaError(f"no {key} column")
+    attrs = [(key, definition[key], i) for key, i in sorted(index.items(), key=lambda kv: kv[1])
+             if key in definition]
+    width = len(columns)
+    with open_file(path, 'r', newline='') as f:
+        for row in itertools.islice(csv.reader(f, delimiter=';'), skip, None):
+            row += [''] * (width - len(row))
+            yield (row[index['Name']], row[index['DeplState']], row[index['InciState']],
+                   [(key, spec, row[i]) for key, spec, i in attrs])
+
+def batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+class SQLFile:
+    # Statements written to a file, one transaction per batch
+    def __init__(self, path, dialect):
+        self.f = open_file(path, 'w')
+        self.begin = dialect.begin
+        if dialect.name == 'mysql':
+            self.f.write("SET NAMES utf8mb4;\n")
+        for statement in STAGING:
+            self.f.write(statement + '\n')
+
+    def run(self, statements):
+        self.f.write(f"{self.begin};\n")
+        for statement in statements:
+            self.f.write(statement + '\n')
+        self.f.write("COMMIT;\n")
+
+    def close(self):
+        self.f.close()
+
+class SQLiteTarget:
+    # Statements run on an SQLite database (opened with
+    # isolation_level=None), one transaction per batch
+    def __init__(self, db):
+        self.db = db
+        for statement in STAGING:
+            db.execute(statement)
+
+    def run(self, statements):
+        self.db.execute("BEGIN")
+        try:
+            for statement in statements:
+                self.db.execute(statement)
+        except sqlite3.Error:
+            self.db.execute("ROLLBACK")
+            raise
+        self.db.execute("COMMIT")
+
+    def close(self):
+        self.db.close()
+
+# Just the columns the loader and a read back need
+STANDIN_SCHEMA = """
+CREATE TABLE IF NOT EXISTS general_catalog (
+    id INTEGER PRIMARY KEY, general_catalog_class VARCHAR(100) NOT NULL, name VARCHAR(100) NOT NULL,
+    UNIQUE (general_catalog_class, name));
+CREATE TABLE IF NOT EXISTS configitem_definition (
+    id INTEGER PRIMARY KEY, class_id INTEGER NOT NULL, configitem_definition TEXT NOT NULL, version INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS configitem (
+    id INTEGER PRIMARY KEY, configitem_number VARCHAR(100) NOT NULL UNIQUE, class_id INTEGER NOT NULL,
+    last_version_id INTEGER, cur_depl_state_id INTEGER, cur_inci_state_id INTEGER,
+    create_time DATETIME NOT NULL, create_by INTEGER NOT NULL, change_time DATETIME NOT NULL, change_by INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS configitem_version (
+    id INTEGER PRIMARY KEY, configitem_id INTEGER NOT NULL, name VARCHAR(250) NOT NULL, definition_id INTEGER NOT NULL,
+    depl_state_id INTEGER NOT NULL, inci_state_id INTEGER NOT NULL, create_time DATETIME NOT NULL, create_by INTEGER NOT NULL);
+CREATE INDEX IF NOT EXISTS configitem_version_ci ON configitem_version (configitem_id);
+CREATE INDEX IF NOT EXISTS configitem_version_name ON configitem_version (name);
+CREATE INDEX IF NOT EXISTS configitem_last_version ON configitem (last_version_id);
+CREATE TABLE IF NOT EXISTS xml_storage (
+    xml_type VARCHAR(200) NOT NULL, xml_key VARCHAR(250) NOT NULL, xml_content_key VARCHAR(250) NOT NULL,
+    xml_content_value TEXT);
+CREATE INDEX IF NOT EXISTS xml_storage_key_type ON xml_storage (xml_key, xml_type);
+"""
+
+def init_standin(db, spec, base_dir=BASE_DIR):
+    # The tables, the general_catalog export, a definition per class and the
+    # People CIs that owners refer to
+    db.executescript(STANDIN_SCHEMA)
+    maps = load_id_maps()
+    db.execute("BEGIN")
+    db.executemany("INSERT OR IGNORE INTO general_catalog (id, general_catalog_class, name) VALUES (?, ?, ?)",
+                   [(i, c, maps['catalog'].get(i, '')) for i, c in maps['catalog_class'].items()])
+    class_ids = dict(db.execute("SELECT name, id FROM general_catalog WHERE general_catalog_class = ?",
+                                (CLASS_CATALOG,)))
+    for cls in list(spec) + list(REFERENCE_SOURCES):
+        if cls in class_ids and not db.execute("SELECT 1 FROM configitem_definition WHERE class_id = ?",
+                                               (class_ids[cls],)).fetchone():
+            db.execute("INSERT INTO configitem_definition (class_id, configitem_definition, version)"
+                       " VALUES (?, '', 1)", (class_ids[cls],))
+    db.execute("COMMIT")
+    target = SQLiteTarget(db)
+    for cls, source in REFERENCE_SOURCES.items():
+        path = find_compressed(os.path.join(base_dir, source))
+        if cls not in class_ids or not os.path.exists(path):
+            continue
+        with open_file(path, 'r', newline='') as f:
+            names = dict.fromkeys(row[0] for row in csv.reader(f, delimiter=';') if row)
+        statements = Statements(cls, Dialect('sqlite'), number_prefix='STANDIN')
+        items = ((name, 'Production', 'Ok', [])
+                 for name in names
+                 if not db.execute("SELECT 1 FROM configitem_version WHERE name = ?", (name,)).fetchone())
+        for batch in batches(items, BATCH_SIZE):
+            target.run(statements.batch(batch))
+
+def load_file(path, target, spec, dialect, cls=None, batch_size=BATCH_SIZE,
+              number_prefix=NUMBER_PREFIX, user_id=ROOT_USER_ID, schemas=None, skip=0):
+    # Loads one CSV but its first skip rows; returns the number of CIs.
+    # schemas: run the import_validator.py checks first and refuse a file
+    # with errors. Raises PartialLoad when a batch fails after others were
+    # committed.
+    file_cls, columns = class_for_file(path, spec)
+    cls = cls or file_cls
+    if cls not in spec:
+        raise SchemaError("cannot tell the class from the file name, use --class")
+    if cls != file_cls or columns is None:
+        # In the column order of the class's field_mapping.yml output
+        columns = spec[cls].column_keys()
+    definition = spec[cls].definition
+    if not definition:
+        raise SchemaError(f"{cls} has no definition in field_mapping.yml")
+    if schemas is not None:
+        report = validate(path, schemas, cls, columns)
+        if report.errors:
+            raise SchemaError(f"{report.errors} validation errors, see import_validator.py")
+    statements = Statements(cls, dialect, user_id, number_prefix)
+    loaded = 0
+    for batch in batches(read_items(path, columns, definition, skip), batch_size):
+        try:
+            target.run(statements.batch(batch))
+        except sqlite3.Error as e:
+            if skip + loaded: raise PartialLoad(e, skip + loaded) from e
+            raise
+        loaded += len(batch)
+    return loaded
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load import CSVs into the Znuny CMDB tables with batched SQL.")
+    parser.add_argument('files', nargs='+')
+    parser.add_argument('--sql', help="write the SQL to this file")
+    parser.add_argument('--sqlite', help="run the SQL on this SQLite database")
+    parser.add_argument('--init-standin', action='store_true', help="create the stand-in tables in --sqlite first")
+    parser.add_argument('--class', dest='cls', help="class of the files (default: from the file name)")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="CIs per transaction")
+    parser.add_argument('--number-prefix', default=NUMBER_PREFIX)
+    parser.add_argument('--skip', type=int, default=0, help="leave out the first N rows of each file (resume)")
+    parser.add_argument('--user-id', type=int, default=ROOT_USER_ID, help="create_by / change_by")
+    parser.add_argument('--dialect', choices=('mysql', 'sqlite'), help="SQL dialect of --sql (default: mysql)")
+    parser.add_argument('--no-validate', action='store_true', help="load without the import_validator.py checks")
+    args = parser.parse_args(argv)
+    if bool(args.sql) == bool(args.sqlite):
+        parser.error("give one of --sql and --sqlite")
+    if args.skip < 0:
+        parser.error("--skip must not be negative")
+    if args.init_standin and not args.sqlite:
+        parser.error("--init-standin needs --sqlite")
+
+    spec = load_spec()
+    schemas = None if args.no_validate else Schemas(spec)
+    if args.sqlite:
+        target = SQLiteTarget(sqlite3.connect(args.sqlite, isolation_level=None))
+        dialect = Dialect('sqlite')
+        if args.init_standin:
+            init_standin(target.db, spec)
+    else:
+        dialect = Dialect(args.dialect or 'mysql')
+        target = SQLFile(args.sql, dialect)
+    failed = False
+    try:
+        for path in args.files:
+            start = time.perf_counter()
+            try:
+                loaded = load_file(path, target, spec, dialect, args.cls, args.batch_size,
+                                   args.number_prefix, args.user_id, schemas, args.skip)
+            except (SchemaError, OSError, sqlite3.Error, PartialLoad) as e:
+                print(f"{path}: {e}", file=sys.stderr)
+                failed = True
+                continue
+            print(f"{path}: {loaded} CIs in {time.perf_counter() - start:.2f}s")
+    finally:
+        target.close()
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+"""Shared reader for the old OTRS CMDB export (old_otrs_cmdb_export_v2.csv).
+
+Header: class,name,cur_status,data_json
+data_json layout: [null, {"Version": [null, {<Attribute>: [null, {...}], ...}]}]
+
+The mount directory can be overridden with the ZNUNY_MOUNT environment
+variable (bench_migration.py runs the scripts against a scratch copy).
+"""
+import csv
+import io
+import json
+import mmap
+import os
+import sys
+
+from compressed import compression_of, find_compressed, open_file
+
+BASE_DIR = os.environ.get('ZNUNY_MOUNT', '/Users/sabyrzhanzhakipov/znuny-mount')
+# A .gz / .xz / .zst copy of the export is read when the plain file is absent
+SOURCE_FILE = find_compressed(f'{BASE_DIR}/old_otrs_cmdb_export_v2.csv')
+
+# data_json blobs of big CIs easily exceed the csv module's 128 KB default
+csv.field_size_limit(sys.maxsize)
+
+
+def iter_rows(source_file=SOURCE_FILE):
+    # Yields (cls, name, status, json_data) for every record, header skipped.
+    with open_file(source_file, 'r', encoding='utf-8') as f:
+        yield from _rows(f, True)
+
+def numbered_rows(source_file=SOURCE_FILE):
+    # (n, cls, name, status, json_data) of iter_rows(), n numbering every
+    # record of the export from 1, header not counted. Records with fewer
+    # than 4 fields are skipped but keep their number.
+    with open_file(source_file, 'r', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        n = 0
+        for row in reader:
+            if not row: continue
+            n += 1
+            if len(row) < 4: continue
+            yield n, row[0], row[1], row[2], row[3]
+
+def _rows(f, skip_header):
+    reader = csv.reader(f)
+    if skip_header: next(reader, None)
+    for row in reader:
+        if len(row) < 4: continue
+        yield row[0], row[1], row[2], row[3]
+
+def record_chunks(source_file=SOURCE_FILE, chunk_size=32 << 20):
+    # Splits the export into (start, end) byte ranges of about chunk_size that
+    # begin and end on record boundaries. data_json is quoted and may span
+    # lines, so a newline only ends a record when the number of quote
+    # characters before it is even (escaped quotes are doubled).
+    size = os.path.getsize(source_file)
+    if not size: return []
+    chunks = []
+    with open(source_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        start = pos = quotes = 0
+        while start < size:
+            nl = m.find(b'\n', start + chunk_size) if start + chunk_size < size else -1
+            while nl != -1:
+                quotes += m[pos:nl].count(b'"')
+                pos = nl
+                if quotes % 2 == 0: break
+                nl = m.find(b'\n', nl + 1)
+            end = size if nl == -1 else nl + 1
+            chunks.append((start, end))
+            start = end
+    return chunks
+
+def read_chunks(source_file=SOURCE_FILE, chunk_size=32 << 20):
+    # (start, data) of every record_chunks() range, read in file order. A
+    # compressed export is split the same way while it is decompressed, and
+    # start is the offset in the decompressed data.
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size must be at least 1, not {chunk_size}")
+    if compression_of(source_file):
+        with open_file(source_file, 'rb') as f:
+            yield from _stream_chunks(f, chunk_size)
+        return
+    with open(source_file, 'rb') as f:
+        for start, end in record_chunks(source_file, chunk_size):
+            f.seek(start)
+            yield start, f.read(end - start)
+
+def _stream_chunks(f, chunk_size):
+    # record_chunks() over a stream: pieces of about chunk_size, each cut
+    # after a newline with an even number of quotes before it
+    start, buf, pos, quotes = 0, b'', 0, 0
+    while block := f.read(chunk_size):
+        buf += block
+        # Quotes are counted in buf[:pos]
+        while len(buf) > chunk_size:
+            nl = buf.find(b'\n', max(pos, chunk_size))
+            while nl != -1:
+                quotes += buf[pos:nl].count(b'"')
+                pos = nl
+                if quotes % 2 == 0: break
+                nl = buf.find(b'\n', nl + 1)
+            if nl == -1: break
+            yield start, buf[:nl + 1]
+            start += nl + 1
+            buf, pos, quotes = buf[nl + 1:], 0, 0
+    if buf:
+        yield start, buf
+
+
+_decoder = json.JSONDecoder()
+
+class ExportRow:
+    # One export record with data_json kept as the raw string. The JSON is
+    # decoded on first access to .data/.version; pluck() can pull a single
+    # attribute without decoding the rest of the blob.
+    __slots__ = ('cls', 'name', 'status', 'raw', '_data')
+
+    def __init__(self, cls, name, status, raw):
+        self.cls, self.name, self.status, self.raw = cls, name, status, raw
+        self._data = None
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = json.loads(self.raw)
+        return self._data
+
+    @property
+    def version(self):
+        return self.data[1]['Version'][1]
+
+    def pluck(self, path, default=''):
+        # path is 'Version.<Attribute>[.<SubAttribute>...].<Field>', e.g.
+        # 'Version.Vladelec.Content'; same result as the usual
+        # v.get(attr, [None, {}])[1].get(field, '') chain.
+        *keys, field = path.split('.')
+        if self._data is None:
+            found, node = self._pluck_raw(keys)
+            if found:
+                return node.get(field, default)
+        node = self.data[1]
+        for key in keys:
+            node = node.get(key, (None, {}))[1]
+        return node.get(field, default)
+
+    def _pluck_raw(self, keys):
+        # Decodes only the [null, {...}] value of the last key. Every attribute
+        # carries its own TagKey, which tells whether a match sits at the
+        # requested depth. The rest of the blob is not validated.
+        # Returns (False, None) when a full decode is needed to be sure.
+        tag_key = '[1]' + ''.join(f"{{'{k}'}}[1]" for k in keys)
+        quoted = f'"{keys[-1]}"'
+        raw = self.raw
+        pos = raw.find(quoted + ':')
+        if pos < 0:
+            # Key not mentioned anywhere: the attribute is absent
+            return (quoted not in raw and raw.startswith('[')), {}
+        while pos >= 0:
+            try:
+                value, end = _decoder.raw_decode(raw, pos + len(quoted) + 1)
+                node = value[1]
+            except (ValueError, IndexError, TypeError, KeyError):
+                return False, None
+            if isinstance(node, dict) and node.get('TagKey') == tag_key:
+                return True, node
+            pos = raw.find(quoted + ':', end)
+        return False, None
+
+def iter_export(source_file=SOURCE_FILE, classes=None):
+    # Yields ExportRow objects; rows of other classes are skipped before any
+    # JSON work is done.
+    for cls, name, status, raw in iter_rows(source_file):
+        if classes is not None and cls not in classes: continue
+        yield ExportRow(cls, name, status, raw)
+
+def iter_export_data(data, classes=None, skip_header=False):
+    # iter_export() over one chunk of the export already in memory (bytes of
+    # a record_chunks() range; the header only in the first one)
+    with io.TextIOWrapper(io.BytesIO(data), encoding='utf-8') as f:
+        for cls, name, status, raw in _rows(f, skip_header):
+            if classes is not None and cls not in classes: continue
+            yield ExportRow(cls, name, status, raw)
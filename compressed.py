@@ -0,0 +1,195 @@
+"""Transparent .gz / .xz / .zst files for the export and the generated CSVs.
+
+open_file() is open() for paths that may end in .gz, .xz or .zst: the
+compression follows the suffix, anything else is a plain file. Reads and
+writes go through 1 MB buffers.
+
+Writes with threads > 1 (the default is one per CPU) compress 4 MB blocks in
+a thread pool, zlib and lzma release the GIL while they work, and write them
+in order as one member / stream / frame each. Concatenated members are a
+valid .gz, .xz or .zst file that every reader, gzip -d and the Python
+modules included, reads as a whole.
+
+zstd is optional: the zstandard module is used when installed (it has
+threads of its own), else Python's compression.zstd (3.14+), else the zstd
+command through a pipe. Without any of them .zst paths raise
+CompressionError.
+
+The scripts with fixed output names write them compressed when ZNUNY_COMPRESS
+is set (gz, xz or zst), see output_path(); SOURCE_FILE in cmdb_export.py
+falls back to a compressed copy of the export when the plain one is absent.
+"""
+import gzip
+import io
+import lzma
+import os
+import shutil
+import subprocess
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+SUFFIXES = {'.gz': 'gz', '.xz': 'xz', '.zst': 'zst'}
+BUFFER_SIZE = 1 << 20
+BLOCK_SIZE = 4 << 20
+LEVELS = {'gz': 6, 'xz': 3, 'zst': 3}
+OUTPUT_COMPRESSION = os.environ.get('ZNUNY_COMPRESS', '')
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+try:
+    from compression import zstd as std_zstd
+except ImportError:
+    std_zstd = None
+
+class CompressionError(ValueError):
+    pass
+
+def compression_of(path):
+    # 'gz', 'xz', 'zst' or None
+    return SUFFIXES.get(os.path.splitext(str(path))[1].lower())
+
+def strip_suffix(path):
+    # The path without its compression suffix
+    return os.path.splitext(path)[0] if compression_of(path) else path
+
+def output_path(path, compression=None):
+    # path with the suffix of compression (default: ZNUNY_COMPRESS) added
+    compression = OUTPUT_COMPRESSION if compression is None else compression
+    if not compression:
+        return path
+    if compression not in LEVELS:
+        raise CompressionError(f"unknown compression {compression!r}, use one of {', '.join(LEVELS)}")
+    return f'{path}.{compression}'
+
+def find_compressed(path):
+    # path, or a compressed copy of it when only that exists
+    if os.path.exists(path):
+        return path
+    for suffix in SUFFIXES:
+        if os.path.exists(path + suffix):
+            return path + suffix
+    return path
+
+def _compress_block(compression, level):
+    if compression == 'gz':
+        def compress(data):
+            c = zlib.compressobj(level, zlib.DEFLATED, 31)
+            return c.compress(data) + c.flush()
+        return compress
+    if compression == 'xz':
+        return lambda data: lzma.compress(data, preset=level)
+    if std_zstd is not None:
+        return lambda data: std_zstd.compress(data, level=level)
+    return None
+
+class _BlockWriter(io.RawIOBase):
+    # Compresses fixed-size blocks in a thread pool, written in order
+    def __init__(self, raw, compress, threads, block_size=BLOCK_SIZE):
+        self.raw = raw
+        self.compress = compress
+        self.pool = ThreadPoolExecutor(threads)
+        self.limit = 2 * threads
+        self.block_size = block_size
+        self.buffer = bytearray()
+        self.pending = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.buffer += data
+        while len(self.buffer) >= self.block_size:
+            self._submit(bytes(self.buffer[:self.block_size]))
+            del self.buffer[:self.block_size]
+        return len(data)
+
+    def _submit(self, block):
+        self.pending.append(self.pool.submit(self.compress, block))
+        while len(self.pending) > self.limit:
+            self.raw.write(self.pending.pop(0).result())
+
+    def close(self):
+        if self.closed: return
+        try:
+            if self.buffer:
+                self._submit(bytes(self.buffer))
+            for future in self.pending:
+                self.raw.write(future.result())
+        finally:
+            self.pool.shutdown()
+            self.raw.close()
+            super().close()
+
+class _Pipe(io.RawIOBase):
+    # The zstd command's stdout (reading) or stdin (writing)
+    def __init__(self, path, writing, level, threads):
+        if not shutil.which('zstd'):
+            raise CompressionError(f"{path}: .zst needs the zstandard module or the zstd command")
+        if writing:
+            self.file = open(path, 'wb')
+            self.proc = subprocess.Popen(['zstd', '-q', '-c', f'-{level}', f'-T{threads}'],
+                                         stdin=subprocess.PIPE, stdout=self.file)
+            self.stream = self.proc.stdin
+        else:
+            self.file = open(path, 'rb')
+            self.proc = subprocess.Popen(['zstd', '-q', '-d', '-c'], stdin=self.file, stdout=subprocess.PIPE)
+            self.stream = self.proc.stdout
+        self.writing = writing
+
+    def readable(self):
+        return not self.writing
+
+    def writable(self):
+        return self.writing
+
+    def readinto(self, b):
+        return self.stream.readinto(b)
+
+    def write(self, data):
+        return self.stream.write(data)
+
+    def close(self):
+        if self.closed: return
+        self.stream.close()
+        status = self.proc.wait()
+        self.file.close()
+        super().close()
+        if status and self.writing:
+            raise CompressionError(f"zstd exited with status {status}")
+
+def _open_binary(path, writing, compression, level, threads):
+    if compression == 'zst' and zstandard is not None:
+        if writing:
+            return zstandard.ZstdCompressor(level=level, threads=threads if threads > 1 else 0) \
+                .stream_writer(open(path, 'wb'), closefd=True)
+        return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), read_across_frames=True, closefd=True)
+    if writing and threads > 1:
+        compress = _compress_block(compression, level)
+        if compress is not None:
+            return _BlockWriter(open(path, 'wb'), compress, threads)
+    if compression == 'gz':
+        return gzip.open(path, 'wb' if writing else 'rb', compresslevel=level)
+    if compression == 'xz':
+        return lzma.open(path, 'wb' if writing else 'rb', preset=level if writing else None)
+    if std_zstd is not None:
+        return std_zstd.open(path, 'wb' if writing else 'rb', level=level if writing else None)
+    return _Pipe(path, writing, level, threads)
+
+def open_file(path, mode='r', encoding='utf-8', newline=None, level=None, threads=None):
+    # open() with the compression of the path's suffix. mode is 'r', 'w',
+    # 'rb' or 'wb'.
+    compression = compression_of(path)
+    if compression is None:
+        if 'b' in mode:
+            return open(path, mode, buffering=BUFFER_SIZE)
+        return open(path, mode, encoding=encoding, newline=newline, buffering=BUFFER_SIZE)
+    writing = mode[0] == 'w'
+    level = LEVELS[compression] if level is None else level
+    threads = threads or os.cpu_count() or 1
+    raw = _open_binary(path, writing, compression, level, threads)
+    buffered = io.BufferedWriter(raw, BUFFER_SIZE) if writing else io.BufferedReader(raw, BUFFER_SIZE)
+    if 'b' in mode:
+        return buffered
+    return io.TextIOWrapper(buffered, encoding=encoding, newline=newline)
@@ -0,0 +1,23 @@
+"""Fixtures shared by the test_*.py checks."""
+import csv
+import json
+
+import pytest
+
+def attr(fields):
+    return [None, fields]
+
+@pytest.fixture
+def write_export(tmp_path):
+    # write_export(records) -> path of a small export in tmp_path; records:
+    # (class, name, {attribute: {field: value}})
+    def write(records, name='export.csv'):
+        path = tmp_path / name
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f, quoting=csv.QUOTE_ALL)
+            writer.writerow(['class', 'name', 'cur_status', 'data_json'])
+            for cls, ci_name, attributes in records:
+                version = {key: attr(fields) for key, fields in attributes.items()}
+                writer.writerow([cls, ci_name, 'Production', json.dumps([None, {'Version': attr(version)}])])
+        return path
+    return write
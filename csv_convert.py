@@ -0,0 +1,143 @@
+"""Delimiter conversion for the generated import CSVs.
+
+Produces exactly what csv.reader(delimiter=FROM) -> csv.writer(delimiter=TO)
+writes (minimal quoting, CRLF line ends), without building a row list per
+line. The input is read in blocks of whole lines, and every run of lines
+without a quote character or the target delimiter is converted with two
+str.replace() calls. Only a line that has one goes through the csv module,
+which pulls in the following lines when a quoted field spans them.
+
+Several files are converted in parallel with --jobs. Each output is written
+next to its source as NAME{suffix}.csv unless --out names it (one source).
+Sources and outputs may be .gz / .xz / .zst files (see compressed.py); an
+output named after its source keeps the source's compression.
+
+Usage: python3 csv_convert.py FILE... [--from ';'] [--to ','] [--suffix _comma]
+                              [--out FILE] [--jobs N]
+"""
+import argparse
+import csv
+import multiprocessing
+import os
+
+from compressed import open_file, strip_suffix
+
+BLOCK_SIZE = 1 << 20
+TERMINATOR = '\r\n'
+
+def _blocks(f, block_size):
+    # Text blocks that end on a line end, except maybe the last one
+    rest = ''
+    while chunk := f.read(block_size):
+        chunk = rest + chunk
+        cut = chunk.rfind('\n') + 1
+        if cut:
+            yield chunk[:cut]
+            rest = chunk[cut:]
+        else:
+            rest = chunk
+    if rest:
+        yield rest
+
+class _Feed:
+    # The current block and the read position in it. Iterating yields lines
+    # (with their '\n'), and reading past the block's end, for a quoted field
+    # that spans blocks, pulls in the next block.
+    def __init__(self, block, blocks):
+        self.block = block
+        self.pos = 0
+        self.blocks = blocks
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.pos == len(self.block):
+            self.block = next(self.blocks)
+            self.pos = 0
+        end = self.block.find('\n', self.pos) + 1 or len(self.block)
+        line = self.block[self.pos:end]
+        self.pos = end
+        return line
+
+def convert_stream(src, dst, from_delim=';', to_delim=',', block_size=BLOCK_SIZE):
+    # src: text file opened with universal newlines, dst: opened with
+    # newline=''. Returns the number of records that needed the csv module.
+    writer = csv.writer(dst, delimiter=to_delim)
+    quote = '"'
+    slow = 0
+
+    def fast(text):
+        # Whole lines without a quote or the target delimiter
+        if not text.endswith('\n'): text += '\n'
+        dst.write(text.replace(from_delim, to_delim).replace('\n', TERMINATOR))
+
+    blocks = _blocks(src, block_size)
+    for block in blocks:
+        feed = _Feed(block, blocks)
+        next_quote = next_delim = -1
+        while feed.pos < len(feed.block):
+            text, pos = feed.block, feed.pos
+            # Next quote / target delimiter (len(text) when none), each searched
+            # again only once passed
+            if next_quote < pos: next_quote = text.find(quote, pos) % (len(text) + 1)
+            if next_delim < pos: next_delim = text.find(to_delim, pos) % (len(text) + 1)
+            hit = min(next_quote, next_delim)
+            if hit == len(text):
+                fast(text[pos:])
+                break
+            start = text.rfind('\n', pos, hit) + 1 or pos
+            if start > pos:
+                fast(text[pos:start])
+            feed.pos = start
+            for row in csv.reader(feed, delimiter=from_delim):
+                writer.writerow(row)
+                break
+            slow += 1
+            if feed.block is not text:
+                next_quote = next_delim = -1
+    return slow
+
+def convert(source, output, from_delim=';', to_delim=',', block_size=BLOCK_SIZE):
+    with open_file(source, 'r') as src, open_file(output, 'w', newline='') as dst:
+        return convert_stream(src, dst, from_delim, to_delim, block_size)
+
+def output_for(source, suffix):
+    # NAME{suffix}.csv, compressed like the source
+    base = strip_suffix(source)
+    stem, ext = os.path.splitext(base)
+    return f'{stem}{suffix}{ext or ".csv"}{source[len(base):]}'
+
+def _convert_job(job):
+    source, output, from_delim, to_delim = job
+    return source, output, convert(source, output, from_delim, to_delim)
+
+def convert_files(jobs_list, jobs=1):
+    # jobs_list: (source, output, from_delim, to_delim); yields
+    # (source, output, records parsed) as the files finish
+    if jobs > 1 and len(jobs_list) > 1:
+        with multiprocessing.Pool(min(jobs, len(jobs_list))) as pool:
+            yield from pool.imap_unordered(_convert_job, jobs_list)
+    else:
+        yield from map(_convert_job, jobs_list)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Change the delimiter of CSV files.")
+    parser.add_argument('files', nargs='+')
+    parser.add_argument('--from', dest='from_delim', default=';')
+    parser.add_argument('--to', dest='to_delim', default=',')
+    parser.add_argument('--suffix', default='_comma', help="output name suffix (default: %(default)s)")
+    parser.add_argument('--out', help="output file, for a single source")
+    parser.add_argument('--jobs', type=int, default=1, help="convert this many files at once")
+    args = parser.parse_args(argv)
+    if args.out and len(args.files) > 1:
+        parser.error("--out takes a single source file")
+    if len(args.from_delim) != 1 or len(args.to_delim) != 1:
+        parser.error("delimiters must be single characters")
+
+    jobs_list = [(f, args.out or output_for(f, args.suffix), args.from_delim, args.to_delim) for f in args.files]
+    for source, output, slow in convert_files(jobs_list, args.jobs):
+        print(f"{source} -> {output} ({slow} records parsed)")
+
+if __name__ == '__main__':
+    main()
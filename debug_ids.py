@@ -1,8 +1,8 @@
-import csv
-import json
-import re
+from cmdb_export import SOURCE_FILE
+from id_xref import scan
+from people_index import PeopleIndex
 
-source_file = '/Users/sabyrzhanzhakipov/znuny-mount/old_otrs_cmdb_export_v2.csv'
+source_file = SOURCE_FILE
 
 # Mappings
 # We suspect '2695' etc are ConfigItemIDs.
@@ -17,52 +17,17 @@ source_file = '/Users/sabyrzhanzhakipov/znuny-mount/old_otrs_cmdb_export_v2.csv'
 # Maybe the 'Name' column (row[1]) contains something?
 # Header: class,name,cur_status,data_json
 
-with open(source_file, 'r', encoding='utf-8') as f:
-    reader = csv.reader(f)
-    next(reader)
-    for row in reader:
-        if row[0] == 'People':
-            # print(f"People Name: {row[1]}, Status: {row[2]}, JSON: {row[3][:100]}")
-            pass
-
-# I'll search for '2695' in the whole file and see the context.
-with open(source_file, 'r', encoding='utf-8') as f:
-    content = f.read()
-    # Find all occurrences of 2695 and look at surrounding CMDB class
-    matches = re.finditer(r'2695', content)
-    for i, m in enumerate(matches):
-        start = max(0, m.start() - 100)
-        end = min(len(content), m.end() + 100)
-        # print(f"Match {i}: ... {content[start:end]} ...")
-        if i > 5: break
-
-# Actually, I'll just create a map of all ResolvedUser and ResolvedName.
-user_id_to_login = {}
-id_to_name = {}
-
-def find_all(obj):
-    if isinstance(obj, dict):
-        cid = obj.get('Content')
-        if cid:
-            cid_str = str(cid)
-            if 'ResolvedUser' in obj:
-                user_id_to_login[cid_str] = obj['ResolvedUser']
-            if 'ResolvedName' in obj:
-                id_to_name[cid_str] = obj['ResolvedName']
-        for v in obj.values():
-            find_all(v)
-    elif isinstance(obj, list):
-        for item in obj:
-            find_all(item)
-
-with open(source_file, 'r', encoding='utf-8') as f:
-    reader = csv.reader(f)
-    next(reader)
-    for row in reader:
-        try:
-            data = json.loads(row[3])
-            find_all(data)
-        except: continue
+# Which rows reference 2695 etc., from one streaming pass (see id_xref.py
+# for the CLI and the prebuilt index)
+for i, (content, n, cls, attr) in enumerate(scan(source_file, ['1690', '2695', '1691', '1979'])):
+    # print(f"Match {i}: {content} <- row {n} {cls}.{attr}")
+    if i > 5: break
+
+# Actually, I'll just use the map of all ResolvedUser and ResolvedName from the People index.
+index = PeopleIndex.open(source_file)
+user_id_to_login = index.user_map()
+id_to_name = index.catalog_map()
+index.close()
 
 print(f"Users: {len(user_id_to_login)}")
 print(f"Names: {len(id_to_name)}")
@@ -0,0 +1,130 @@
+"""Per-row content hashes of the previous migration run, for delta mode.
+
+The export has no CI ID column, its name column is blank and every record's
+TagKey is "[1]", and the emitted Names repeat heavily (all Keys rows are
+"Tuner"), so no position or ordinal identifies a CI across runs. Instead the
+state keeps, per (class, Name), the multiset of hashes of the rows emitted
+under that Name, each with the row itself. The hash covers the complete
+output row, resolved owner included.
+
+A row whose hash is still among the unmatched old hashes of its Name is
+unchanged; any other row is written. Once the run is over, the old rows of a
+Name that nothing matched are paired with its new rows (counted as changed),
+and the rest are deletions, listed with their hash and old row so the CI can
+be told apart from others of the same Name. Records of the class that could
+not be converted this run keep an old row in the state instead of having it
+reported (see hold()).
+"""
+import hashlib
+import json
+import sqlite3
+from collections import defaultdict
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS row_hashes (cls TEXT, name TEXT, hash BLOB, row TEXT);
+CREATE INDEX IF NOT EXISTS row_hashes_cls ON row_hashes (cls);
+"""
+
+def row_hash(row):
+    return hashlib.blake2b('\x1f'.join(map(str, row)).encode('utf-8'), digest_size=16).digest()
+
+class DeltaState:
+    def __init__(self, path):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+        self._upgrade()
+        # (cls, name) -> {hash: [row text, ...]} of old rows not matched yet
+        self.previous = defaultdict(lambda: defaultdict(list))
+        for cls, name, h, row in self.db.execute("SELECT cls, name, hash, row FROM row_hashes ORDER BY rowid"):
+            self.previous[(cls, name)][h].append(row)
+        self.current = []
+        self.written = defaultdict(int)
+        self.held = defaultdict(list)
+        self.kept = []
+        self.stats = {}
+
+    def _upgrade(self):
+        # State files of the (class, Name, ordinal) layout: their hashes are
+        # kept, the rows themselves were never stored
+        tables = {name for name, in self.db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        if 'rows' in tables:
+            with self.db:
+                self.db.execute("INSERT INTO row_hashes SELECT cls, name, hash, NULL FROM rows")
+                self.db.execute("DROP TABLE rows")
+
+    def _stats(self, cls):
+        st = self.stats.get(cls)
+        if st is None:
+            st = self.stats[cls] = {'new': 0, 'changed': 0, 'unchanged': 0, 'deleted': 0}
+        return st
+
+    def check(self, cls, name, row):
+        # Records the row and tells whether it is new or changed since the
+        # previous run, i.e. whether it has to be emitted.
+        h = row_hash(row)
+        self.current.append((cls, name, h, json.dumps(row, ensure_ascii=False)))
+        old = self.previous.get((cls, name))
+        if old and old.get(h):
+            old[h].pop()
+            self._stats(cls)['unchanged'] += 1
+            return False
+        self.written[(cls, name)] += 1
+        return True
+
+    def hold(self, cls, name=None):
+        # A record of cls that could not be converted this run (see
+        # quarantine.py): one old row of its Name, or of any Name when it is
+        # not known, stays in the state instead of being reported as deleted
+        self.held[cls].append(name)
+
+    def _take(self, keys):
+        # Removes one unmatched old row of the first of keys that has one:
+        # ((cls, name), hash, row), or None
+        for key in keys:
+            for h, rows in self.previous.get(key, {}).items():
+                if rows:
+                    return key, h, rows.pop()
+        return None
+
+    def deletions(self, classes):
+        # (class, name, hash, old row) of the rows of the given classes that
+        # the previous run had and this one neither emitted nor held; also
+        # settles the new/changed/deleted counts
+        gone = []
+        for cls in classes:
+            keys = [key for key in self.previous if key[0] == cls]
+            # Held records keep an old row of their Name first; those of an
+            # unknown Name, or of one with no old row left, any old row
+            unnamed = 0
+            for name in self.held.get(cls, []):
+                old = self._take([(cls, name)]) if name is not None else None
+                if old: self.kept.append((*old[0], old[1], old[2]))
+                else: unnamed += 1
+            for _ in range(unnamed):
+                old = self._take(keys)
+                if old is None: break
+                self.kept.append((*old[0], old[1], old[2]))
+            # Per Name, old rows left over are paired with the rows written
+            # (changed); the rest of those are new, the rest of these deleted
+            st = self._stats(cls)
+            for key in dict.fromkeys(keys + [key for key in self.written if key[0] == cls]):
+                left = [(h, row) for h, rows in self.previous.get(key, {}).items() for row in rows]
+                written = self.written.get(key, 0)
+                changed = min(len(left), written)
+                st['changed'] += changed
+                st['new'] += written - changed
+                for h, row in left[changed:]:
+                    gone.append((cls, key[1], h.hex(), row or ''))
+                    st['deleted'] += 1
+        return gone
+
+    def commit(self, classes):
+        # Makes this run the baseline for the next one, for the given classes only
+        with self.db:
+            self.db.executemany("DELETE FROM row_hashes WHERE cls = ?", [(cls,) for cls in classes])
+            self.db.executemany("INSERT INTO row_hashes VALUES (?, ?, ?, ?)",
+                                [r for r in self.current + self.kept if r[0] in classes])
+
+    def close(self):
+        self.db.close()
@@ -0,0 +1,229 @@
+"""Columnar copy of the CMDB export for the analysis scripts.
+
+old_otrs_cmdb_export_v2.csv is converted once into {source}.columns, one
+table per class with a column per flattened attribute field, e.g.
+'Version.Group.ResolvedName' (the path pluck() takes), plus 'name' and
+'cur_status'. Values keep their JSON types, except lists and objects, which
+are stored as their JSON text (sorted keys) so every value can be grouped
+on; a field a row does not have is None. Only the first instance of an
+attribute is kept, as pluck() does, and rows whose data_json does not decode
+are left out (counted as 'skipped').
+
+Every column is dictionary encoded: its distinct values once, and one array
+of codes into them per row (0 is None). The file starts with a marshal
+header holding the source_meta() of the export and the byte range of every
+column, so a reader seeks to the few columns it needs and decodes nothing
+else. The file is rebuilt when the export changes, like people_index.py.
+
+Usage: python3 export_columns.py [--source CSV] [--rebuild] [--class CLS]
+"""
+import argparse
+import json
+import marshal
+import os
+import shutil
+from array import array
+from collections import Counter
+
+from cmdb_export import SOURCE_FILE, iter_export
+from people_index import file_hash, source_meta
+
+MAGIC = b'CMDBCOL2'
+
+def columns_path(source_file):
+    return f'{source_file}.columns'
+
+def flatten(node, prefix, out):
+    # {path: value} of the fields of one [null, {...}] attribute tree
+    for key, value in node.items():
+        if key == 'TagKey': continue
+        if isinstance(value, list) and len(value) > 1 and isinstance(value[1], dict):
+            flatten(value[1], f'{prefix}{key}.', out)
+            continue
+        out[prefix + key] = value
+    return out
+
+class _Column:
+    # Codes of one column while building; rows before its first value are 0
+    __slots__ = ('values', 'index', 'codes')
+
+    def __init__(self, rows):
+        self.values = [None]
+        self.index = {}
+        self.codes = array('I', bytes(4 * rows))
+
+    def append(self, value):
+        if isinstance(value, (list, dict)):
+            value = json.dumps(value, sort_keys=True, ensure_ascii=False)
+        try:
+            code = self.index[value]
+        except KeyError:
+            code = self.index[value] = len(self.values)
+            self.values.append(value)
+        self.codes.append(code)
+
+    def encode(self):
+        # Narrowest array type for the codes
+        typecode = 'B' if len(self.values) <= 0xff else 'H' if len(self.values) <= 0xffff else 'I'
+        return marshal.dumps((self.values, typecode, array(typecode, self.codes).tobytes()))
+
+def build(source_file=SOURCE_FILE, path=None):
+    path = path or columns_path(source_file)
+    meta = dict(source_meta(source_file))
+    tables = {}
+    skipped = 0
+    for row in iter_export(source_file):
+        try:
+            fields = flatten(row.data[1], '', {})
+        except (ValueError, IndexError, TypeError, KeyError, AttributeError):
+            skipped += 1
+            continue
+        fields['name'], fields['cur_status'] = row.name, row.status
+        table = tables.setdefault(row.cls, {'rows': 0, 'columns': {}})
+        columns, n = table['columns'], table['rows']
+        for name in fields.keys() - columns.keys():
+            columns[name] = _Column(n)
+        for name, column in columns.items():
+            column.append(fields.get(name))
+        table['rows'] = n + 1
+    meta['skipped'] = str(skipped)
+
+    blobs, layout, offset = [], {}, 0
+    for cls, table in tables.items():
+        entry = layout[cls] = {'rows': table['rows'], 'columns': {}}
+        for name in sorted(table['columns']):
+            blob = table['columns'][name].encode()
+            entry['columns'][name] = (offset, len(blob))
+            blobs.append(blob)
+            offset += len(blob)
+    header = marshal.dumps({'meta': meta, 'tables': layout})
+
+    # Written to a side file and swapped in, so readers never see half a file
+    tmp = f'{path}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(MAGIC + len(header).to_bytes(8, 'little') + header)
+        for blob in blobs:
+            f.write(blob)
+    os.replace(tmp, path)
+    return ColumnStore(path)
+
+class ColumnStore:
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a column file")
+            size = int.from_bytes(f.read(8), 'little')
+            header = marshal.loads(f.read(size))
+        self.meta = header['meta']
+        self.tables = header['tables']
+        self.data_start = len(MAGIC) + 8 + size
+        self._cache = {}
+
+    @classmethod
+    def open(cls, source_file=SOURCE_FILE, path=None, rebuild=False):
+        # A store that matches source_file, rebuilt when it does not
+        path = path or columns_path(source_file)
+        if not rebuild and os.path.exists(path):
+            try:
+                store = cls(path)
+            except (OSError, ValueError, EOFError, TypeError, KeyError):
+                store = None
+            if store is not None and store.is_fresh(source_file):
+                return store
+        return build(source_file, path)
+
+    def is_fresh(self, source_file):
+        st = os.stat(source_file)
+        if self.meta.get('source_size') != str(st.st_size):
+            return False
+        if self.meta.get('source_mtime_ns') == str(st.st_mtime_ns):
+            return True
+        # Touched but possibly unchanged (e.g. copied between hosts): confirm by hash
+        if self.meta.get('source_sha256') != file_hash(source_file):
+            return False
+        self.meta['source_mtime_ns'] = str(st.st_mtime_ns)
+        self._write_header()
+        return True
+
+    def _write_header(self):
+        # Rewrites the file with the current meta; the columns are copied as
+        # they are, through a side file like build()
+        header = marshal.dumps({'meta': self.meta, 'tables': self.tables})
+        tmp = f'{self.path}.tmp'
+        with open(self.path, 'rb') as src, open(tmp, 'wb') as f:
+            f.write(MAGIC + len(header).to_bytes(8, 'little') + header)
+            src.seek(self.data_start)
+            shutil.copyfileobj(src, f)
+        os.replace(tmp, self.path)
+        self.data_start = len(MAGIC) + 8 + len(header)
+
+    def classes(self):
+        return list(self.tables)
+
+    def rows(self, cls):
+        return self.tables[cls]['rows'] if cls in self.tables else 0
+
+    def columns(self, cls):
+        return list(self.tables[cls]['columns']) if cls in self.tables else []
+
+    def encoded(self, cls, name):
+        # (values, codes): the distinct values of a column, None first, and
+        # the code of every row. A column the class lacks is all None.
+        key = (cls, name)
+        if key not in self._cache:
+            table = self.tables.get(cls)
+            if table is None or name not in table['columns']:
+                return [None], array('B', bytes(self.rows(cls)))
+            offset, size = table['columns'][name]
+            with open(self.path, 'rb') as f:
+                f.seek(self.data_start + offset)
+                values, typecode, raw = marshal.loads(f.read(size))
+            codes = array(typecode)
+            codes.frombytes(raw)
+            self._cache[key] = (values, codes)
+        return self._cache[key]
+
+    def column(self, cls, name, default=None):
+        # The decoded values of one column, one per row
+        values, codes = self.encoded(cls, name)
+        values = [default if v is None else v for v in values]
+        return [values[c] for c in codes]
+
+    def group(self, cls, by, of=None, default=''):
+        # {key: row count}, or {key: set of the distinct 'of' values}, keys in
+        # order of first appearance. Works on the codes, so each value is
+        # decoded once; a missing value counts as default.
+        keys, key_codes = self.encoded(cls, by)
+        keys = [default if v is None else v for v in keys]
+        result = {}
+        if of is None:
+            # Counter counts the code array in C
+            for c, n in Counter(key_codes).items():
+                result[keys[c]] = result.get(keys[c], 0) + n
+            return result
+        values, value_codes = self.encoded(cls, of)
+        values = [default if v is None else v for v in values]
+        for c, vc in dict.fromkeys(zip(key_codes, value_codes)):
+            result.setdefault(keys[c], set()).add(values[vc])
+        return result
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or check the columnar copy of a CMDB export.")
+    parser.add_argument('--source', default=SOURCE_FILE)
+    parser.add_argument('--rebuild', action='store_true')
+    parser.add_argument('--class', dest='cls', help="list the columns of one class")
+    args = parser.parse_args(argv)
+
+    store = ColumnStore.open(args.source, rebuild=args.rebuild)
+    if args.cls:
+        for name in store.columns(args.cls):
+            values, codes = store.encoded(args.cls, name)
+            print(f"{name}: {len(values) - 1} distinct")
+        return
+    print(f"{store.path}: {os.path.getsize(store.path)} bytes, {store.meta.get('skipped')} rows skipped")
+    for cls in store.classes():
+        print(f"{cls}: {store.rows(cls)} rows, {len(store.columns(cls))} columns")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,190 @@
+"""Compiles field_mapping.yml into one extractor function per class.
+
+Each class spec is turned into Python source once, at load time, so the per
+row work is a straight sequence of dict lookups: no per-field helper calls,
+no throwaway [None, {}] defaults, and each attribute looked up only once.
+The generated functions are the emitters of migrate_export.py:
+
+    emit(name_orig, status, version) -> (row, owner_column, owner_candidates) or None
+
+See field_mapping.yml for the spec format.
+"""
+import os
+import re
+
+import yaml
+
+from mojibake import fix_mojibake
+
+SPEC_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'field_mapping.yml')
+
+_EMPTY = (None, {})
+_PARENS = re.compile(r'\((.*?)\)')
+
+# Definition Input.Type -> (field read, mojibake repaired)
+INPUT_TYPES = {
+    'GeneralCatalog': ('ResolvedName', True),
+    'Text': ('Content', True),
+    'TextArea': ('Content', True),
+    'Date': ('Content', False),
+    'CIClassReference': ('ResolvedUserFull', True),
+}
+
+class SpecError(ValueError):
+    pass
+
+def load_definition(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return {attr['Key']: attr.get('Input', {}) for attr in yaml.safe_load(f) or []}
+
+class ClassSpec:
+    def __init__(self, cls, spec, base_dir):
+        self.cls = cls
+        self.output = spec['output']
+        self.columns = spec['columns']
+        self.name_fallback = spec.get('name_fallback')
+        self.skip_empty_name = spec.get('skip_empty_name', False)
+        self.definition = load_definition(os.path.join(base_dir, spec['definition'])) if spec.get('definition') else {}
+        self.name_column = self._index(lambda c: c.get('name'), 'a name column')
+        self.owner_column = self._index(lambda c: 'owner' in c, 'an owner column')
+
+    def column_keys(self):
+        # Attribute key per output column (None for the other columns). The
+        # name column is Name, the two constant columns after it are
+        # DeplState and InciState, other constants fill their key: if any.
+        keys = []
+        after_name = []
+        for col in self.columns:
+            if col.get('name'):
+                keys.append('Name')
+                after_name = ['DeplState', 'InciState']
+                continue
+            if 'const' in col and after_name:
+                keys.append(after_name.pop(0))
+                continue
+            after_name = []
+            if 'attr' in col: keys.append(col['attr'])
+            elif 'const' in col: keys.append(col.get('key'))
+            elif 'owner' in col: keys.append(col['owner'][0])
+            else: keys.append(None)
+        return keys
+
+    def _index(self, pred, what):
+        found = [i for i, c in enumerate(self.columns) if pred(c)]
+        if len(found) != 1:
+            raise SpecError(f"{self.cls}: needs exactly one {what}")
+        return found[0]
+
+    def attr_rule(self, col):
+        # (field, fix) for an attr column: explicit settings, else by the
+        # definition's Input.Type, else Content as is / Resolved* repaired
+        input_type = self.definition.get(col['attr'], {}).get('Type')
+        if input_type in INPUT_TYPES:
+            field, fix = INPUT_TYPES[input_type]
+        else:
+            field = col.get('field', 'Content')
+            fix = field.startswith('Resolved')
+        field = col.get('field', field)
+        return field, col.get('fix', fix)
+
+    def source(self):
+        # Python source of the extractor function
+        lines = [f"def emit_{self.cls}(name_orig, status, v):"]
+        ids, attrs, values = {}, {}, []
+
+        def attr_var(key):
+            if key not in attrs:
+                attrs[key] = f"a{len(attrs)}"
+                lines.append(f"    {attrs[key]} = v.get({key!r}, _EMPTY)[1]")
+            return attrs[key]
+
+        # Attribute columns first; derived columns may refer to any of them
+        for i, col in enumerate(self.columns):
+            if 'attr' not in col: continue
+            field, fix = self.attr_rule(col)
+            expr = f"{attr_var(col['attr'])}.get({field!r}, '')"
+            if fix: expr = f"fix_mojibake({expr})"
+            if col.get('strip_newlines'): expr += ".replace('\\n', ' ').replace('\\r', '')"
+            var = f"c{i}"
+            lines.append(f"    {var} = {expr}")
+            ids[col.get('id', col['attr'])] = var
+            values.append(f"{var} or {col['default']!r}" if 'default' in col else var)
+
+        lines.append("    item_name = fix_mojibake(name_orig)")
+
+        owner = self.columns[self.owner_column]
+        keys = owner['owner']
+        lines.append(f"    owner_name = fix_mojibake(v.get({keys[0]!r}, _EMPTY)[1].get('ResolvedUserFull', ''))")
+        for key in keys[1:]:
+            lines.append("    if not owner_name:")
+            lines.append(f"        owner_name = fix_mojibake(v.get({key!r}, _EMPTY)[1].get('ResolvedUserFull', ''))")
+        ids[owner.get('id', 'Owner')] = 'owner_name'
+        if owner.get('name_parens'):
+            lines.append("    m = _PARENS.search(item_name)")
+            lines.append("    candidates = (owner_name, m.group(1)) if m else (owner_name,)")
+        else:
+            lines.append("    candidates = (owner_name,)")
+
+        for i, col in enumerate(self.columns):
+            if 'map' not in col: continue
+            src = self._ref(ids, col['map'])
+            var = f"c{i}"
+            for n, rule in enumerate(col.get('rules', [])):
+                kw = 'if' if n == 0 else 'elif'
+                if 'in' in rule:
+                    cond = f"{src} in {tuple(rule['in'])!r}"
+                elif 'contains' in rule:
+                    cond = f"{rule['contains']!r} in {src}"
+                else:
+                    raise SpecError(f"{self.cls}: map rule needs 'in' or 'contains'")
+                lines.append(f"    {kw} {cond}:")
+                lines.append(f"        {var} = {rule['value']!r}")
+            if col.get('rules'):
+                lines.append("    else:")
+                lines.append(f"        {var} = {col.get('default', '')!r}")
+            else:
+                lines.append(f"    {var} = {col.get('default', '')!r}")
+            ids[col.get('id', f'map{i}')] = var
+
+        if self.name_fallback:
+            a, b = (self._ref(ids, key) for key in self.name_fallback)
+            lines.append('    if not item_name or item_name.strip() == "":')
+            lines.append(f'        item_name = f"{{{a}}} ({{{b}}})" if {b} else {a}')
+        if self.skip_empty_name:
+            lines.append("    if not item_name: return None")
+
+        row, attr_values = [], iter(values)
+        for i, col in enumerate(self.columns):
+            if 'const' in col: row.append(repr(col['const']))
+            elif col.get('name'): row.append('item_name')
+            elif 'owner' in col: row.append('None')
+            elif 'attr' in col: row.append(next(attr_values))
+            elif 'map' in col: row.append(f"c{i}")
+            else: raise SpecError(f"{self.cls}: column {i + 1} has no known kind")
+        lines.append(f"    return [{', '.join(row)}], {self.owner_column}, candidates")
+        return '\n'.join(lines) + '\n'
+
+    def _ref(self, ids, key):
+        if key not in ids:
+            raise SpecError(f"{self.cls}: unknown column id {key!r}")
+        return ids[key]
+
+    def compile(self):
+        namespace = {'_EMPTY': _EMPTY, '_PARENS': _PARENS, 'fix_mojibake': fix_mojibake}
+        exec(compile(self.source(), f'<field_mapping.yml:{self.cls}>', 'exec'), namespace)
+        return namespace[f'emit_{self.cls}']
+
+def load_spec(spec_file=SPEC_FILE):
+    with open(spec_file, 'r', encoding='utf-8') as f:
+        spec = yaml.safe_load(f)
+    base_dir = os.path.dirname(os.path.abspath(spec_file))
+    return {cls: ClassSpec(cls, s, base_dir) for cls, s in spec.items()}
+
+def compile_spec(spec_file=SPEC_FILE):
+    # class -> (emitter, output file, name column)
+    return {cls: (s.compile(), s.output, s.name_column) for cls, s in load_spec(spec_file).items()}
+
+if __name__ == '__main__':
+    # Prints the generated extractors
+    for s in load_spec().values():
+        print(s.source())
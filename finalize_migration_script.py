@@ -1,16 +1,171 @@
-with open('notifications_logical.json', 'r', encoding='utf-8') as f:
-    json_content = f.read()
+"""Fills notifications_logical.json into the migrate_ci_notifications.pl template.
 
-with open('migrate_ci_notifications.pl', 'r', encoding='utf-8') as f:
-    pl_content = f.read()
+The template is copied line by line up to [DATA_PLACEHOLDER], the JSON is
+streamed in after it in chunks, and the rest of the template follows, so
+neither file is ever held in memory as a whole. The placeholder sits inside
+a <<'JSON_DATA' heredoc, which would end early at a payload line that reads
+exactly JSON_DATA; such a payload is refused and no script is written.
 
-# Escape backslashes in JSON for Perl heredoc (if any)
-# Actually, heredoc <<'JSON_DATA' with single quotes doesn't interpolate.
-# But we need to make sure the delimiter JSON_DATA is not inside the json.
+[LOOKUPS_PLACEHOLDER] is filled the same way with the lookup manifest
+(notifications_lookups.json, written by notifications_ingest.py). Without
+that file it is left empty, and the script looks names up as it meets them.
 
-final_pl = pl_content.replace('[DATA_PLACEHOLDER]', json_content)
+With --sidecar the JSON is not embedded at all: it is copied to a data file
+next to the script, and the heredoc is replaced by code that reads that file
+(or the file named by $ENV{CI_NOTIFICATIONS_DATA}) at run time. The lookup
+manifest is small and stays embedded.
 
-with open('migrate_ci_notifications_final.pl', 'w', encoding='utf-8') as f:
-    f.write(final_pl)
+Usage: python3 finalize_migration_script.py [--json FILE] [--lookups FILE]
+                                            [--template FILE]
+                                            [--out FILE] [--sidecar [DATA_FILE]]
+"""
+import argparse
+import os
+import re
+import shutil
 
-print("Final migration script generated: migrate_ci_notifications_final.pl")
+PLACEHOLDER = '[DATA_PLACEHOLDER]'
+LOOKUPS_PLACEHOLDER = '[LOOKUPS_PLACEHOLDER]'
+JSON_FILE = 'notifications_logical.json'
+LOOKUPS_FILE = 'notifications_lookups.json'
+TEMPLATE_FILE = 'migrate_ci_notifications.pl'
+OUTPUT_FILE = 'migrate_ci_notifications_final.pl'
+SIDECAR_FILE = 'migrate_ci_notifications_data.json'
+
+CHUNK_SIZE = 1 << 20
+
+_HEREDOC = re.compile(r"""<<\s*(?:'(\w+)'|"(\w+)"|(\w+))""")
+_PLACEHOLDERS = re.compile('|'.join(map(re.escape, (PLACEHOLDER, LOOKUPS_PLACEHOLDER))))
+
+SIDECAR_LOADER = """do {
+    # Data file written by finalize_migration_script.py --sidecar
+    use FindBin;
+    my $DataFile = $ENV{CI_NOTIFICATIONS_DATA} || "$FindBin::Bin/%s";
+    open my $DataFH, '<:encoding(UTF-8)', $DataFile or die "Cannot open $DataFile: $!\\n";
+    local $/;
+    <$DataFH>;
+}"""
+
+class TerminatorError(ValueError):
+    pass
+
+class TerminatorCheck:
+    # Writes through to dst and fails as soon as a line of the written text
+    # equals terminator. Only the current line is tracked, and only while it
+    # is no longer than the terminator.
+    def __init__(self, dst, terminator):
+        self.dst = dst
+        self.terminator = terminator
+        self.line = ''
+
+    def write(self, text):
+        self.dst.write(text)
+        if self.terminator is None: return
+        term = self.terminator
+        nl = text.rfind('\n')
+        if term in text or (self.line is not None and term in self.line + text[:len(term) + 1]):
+            parts = text.split('\n')
+            for part in parts[:-1]:
+                if self.line is not None and self.line + part == term:
+                    raise TerminatorError(f"payload has a line that ends the {term} heredoc")
+                self.line = ''
+            tail = parts[-1]
+        elif nl < 0:
+            tail = text
+        else:
+            self.line = ''
+            tail = text[nl + 1:]
+        if self.line is not None:
+            self.line += tail
+            if len(self.line) > len(term):
+                self.line = None
+
+def stream_into(out, json_file):
+    if json_file is None: return
+    with open(json_file, 'r', encoding='utf-8') as src:
+        while chunk := src.read(CHUNK_SIZE):
+            out.write(chunk)
+
+def write_line(dst, line, files, terminator):
+    # One template line, with the file of each placeholder (files maps them
+    # to a path, or None for nothing) streamed in
+    pos = 0
+    out = None
+    for m in _PLACEHOLDERS.finditer(line):
+        out = out or TerminatorCheck(dst, terminator)
+        out.write(line[pos:m.start()])
+        stream_into(out, files[m.group()])
+        pos = m.end()
+    if out is None:
+        dst.write(line)
+    else:
+        out.write(line[pos:])
+
+def write_heredoc(dst, lines, m, files, sidecar):
+    # lines: the opener line, the body and the terminator line
+    body = lines[1:-1]
+    if sidecar and any(PLACEHOLDER in line for line in body):
+        opener = lines[0]
+        dst.write(opener[:m.start()] + SIDECAR_LOADER % os.path.basename(sidecar) + opener[m.end():])
+        shutil.copyfile(files[PLACEHOLDER], sidecar)
+        return
+    dst.write(lines[0])
+    for line in body:
+        write_line(dst, line, files, m.group(m.lastindex))
+    dst.write(lines[-1])
+
+def finalize(json_file=JSON_FILE, template=TEMPLATE_FILE, output=OUTPUT_FILE, sidecar=None,
+             lookups_file=LOOKUPS_FILE):
+    # Written to a side file first, so a refused payload leaves no script behind
+    files = {PLACEHOLDER: json_file,
+             LOOKUPS_PLACEHOLDER: lookups_file if lookups_file and os.path.exists(lookups_file) else None}
+    tmp = f'{output}.tmp'
+    try:
+        with open(template, 'r', encoding='utf-8') as tpl, open(tmp, 'w', encoding='utf-8') as dst:
+            heredoc = None
+            for line in tpl:
+                if heredoc is None:
+                    m = _HEREDOC.search(line)
+                    if m:
+                        heredoc = (m, [line])
+                    else:
+                        write_line(dst, line, files, None)
+                    continue
+                m, lines = heredoc
+                lines.append(line)
+                if line.rstrip('\n') == m.group(m.lastindex):
+                    write_heredoc(dst, lines, m, files, sidecar)
+                    heredoc = None
+            if heredoc is not None:
+                # Unterminated heredoc: copied as it is
+                for line in heredoc[1]:
+                    write_line(dst, line, files, None)
+        os.replace(tmp, output)
+    finally:
+        if os.path.exists(tmp): os.remove(tmp)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate the notification migration script from its template.")
+    parser.add_argument('--json', default=JSON_FILE)
+    parser.add_argument('--lookups', default=LOOKUPS_FILE,
+                        help="lookup manifest to embed, skipped when missing ('' for none)")
+    parser.add_argument('--template', default=TEMPLATE_FILE)
+    parser.add_argument('--out', default=OUTPUT_FILE)
+    parser.add_argument('--sidecar', nargs='?', const=SIDECAR_FILE, metavar='DATA_FILE',
+                        help=f"write the data to DATA_FILE (default {SIDECAR_FILE}) next to the script instead of embedding it")
+    args = parser.parse_args(argv)
+
+    sidecar = None
+    if args.sidecar:
+        sidecar = os.path.join(os.path.dirname(os.path.abspath(args.out)), os.path.basename(args.sidecar))
+    try:
+        finalize(args.json, args.template, args.out, sidecar, args.lookups or None)
+    except TerminatorError as e:
+        parser.exit(1, f"{e}; no script written\n")
+
+    print(f"Final migration script generated: {args.out}")
+    if sidecar:
+        print(f"Notification data written to: {sidecar}")
+
+if __name__ == '__main__':
+    main()
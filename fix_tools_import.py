@@ -1,54 +1,30 @@
 import csv
-import json
 import re
 
-source_file = '/Users/sabyrzhanzhakipov/znuny-mount/old_otrs_cmdb_export_v2.csv'
+from cmdb_export import BASE_DIR, SOURCE_FILE, iter_export
+from compressed import open_file, output_path
+from mojibake import fix_mojibake
+from people_index import PeopleIndex
+from quarantine import Quarantine, decode_version
 
-user_map = {}
-catalog_map = {}
+source_file = SOURCE_FILE
 
-def extract_mappings(obj):
-    if isinstance(obj, dict):
-        if 'Content' in obj and 'ResolvedUser' in obj:
-            user_map[str(obj['Content'])] = obj['ResolvedUser']
-        if 'Content' in obj and 'ResolvedName' in obj:
-            catalog_map[str(obj['Content'])] = obj['ResolvedName']
-        for v in obj.values():
-            extract_mappings(v)
-    elif isinstance(obj, list):
-        for item in obj:
-            extract_mappings(item)
-
-with open(source_file, 'r', encoding='utf-8') as f:
-    reader = csv.reader(f)
-    next(reader) # skip header
-    for row in reader:
-        if len(row) < 4: continue
-        try:
-            data = json.loads(row[3])
-            extract_mappings(data)
-        except:
-            continue
+# Content -> ResolvedUser / ResolvedName references come from the persistent People index
+index = PeopleIndex.open(source_file)
+user_map = index.user_map()
+catalog_map = index.catalog_map()
+index.close()
 
 print(f"Mapped {len(user_map)} users and {len(catalog_map)} catalog items.")
 
 # Now fix the tools CSV
-tools_output = '/Users/sabyrzhanzhakipov/znuny-mount/tools_ready_v2.csv'
-mtools_output = '/Users/sabyrzhanzhakipov/znuny-mount/measuring_tools_ready_v2.csv'
+tools_output = output_path(f'{BASE_DIR}/tools_ready_v2.csv')
+mtools_output = output_path(f'{BASE_DIR}/measuring_tools_ready_v2.csv')
+rejects_output = output_path(f'{BASE_DIR}/tools_ready_v2_rejects.csv')
 
-def fix_mojibake(s):
-    if not s: return ""
-    try:
-        return s.encode('latin1').decode('utf-8')
-    except:
-        return s
-
-with open(source_file, 'r', encoding='utf-8') as f, \
-     open(tools_output, 'w', encoding='utf-8', newline='') as f_tools, \
-     open(mtools_output, 'w', encoding='utf-8', newline='') as f_mtools:
-    
-    reader = csv.reader(f)
-    next(reader)
+with open_file(tools_output, 'w', newline='') as f_tools, \
+     open_file(mtools_output, 'w', newline='') as f_mtools, \
+     Quarantine(rejects_output) as quarantine:
     
     writer_tools = csv.writer(f_tools, delimiter=';')
     writer_mtools = csv.writer(f_mtools, delimiter=';')
@@ -56,14 +32,12 @@ with open(source_file, 'r', encoding='utf-8') as f, \
     writer_tools.writerow(['Name', 'DeplState', 'InciState', 'ToolsType', 'SerialNumber', 'Vladelec', 'Vendor', 'Object', 'Notes'])
     writer_mtools.writerow(['Name', 'DeplState', 'InciState', 'ToolsType', 'SerialNumber', 'Vladelec', 'Object', 'Notes'])
     
-    for row in reader:
-        if len(row) < 4: continue
-        cls, name, status, json_data = row[0], row[1], row[2], row[3]
-        if cls not in ['Tools', 'MeasuringTools']: continue
+    # Only Tools/MeasuringTools rows get their data_json decoded
+    for row in iter_export(source_file, classes={'Tools', 'MeasuringTools'}):
+        cls, name, status = row.cls, row.name, row.status
             
         try:
-            data = json.loads(json_data)
-            v = data[1]['Version'][1]
+            v = decode_version(row.raw)
             
             item_name = fix_mojibake(name)
             # Use 'In Use' or 'Operational' if common, but let's try to map if possible.
@@ -108,6 +82,7 @@ with open(source_file, 'r', encoding='utf-8') as f, \
                 writer_mtools.writerow([item_name, item_status, inci_state, tools_type, serial, owner_login, obj, notes])
                 
         except Exception as e:
-            pass
+            quarantine.add_error(cls, name, status, row.raw, e)
 
 print("Fixed CSVs generated with ID-to-Login mapping.")
+print(f"Rejected: {quarantine.summary()} -> {rejects_output}")
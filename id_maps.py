@@ -0,0 +1,167 @@
+"""Complete old OTRS ID -> name maps, read from the database exports.
+
+Sources, each optional (whatever is present is used):
+
+  otrs_general_catalog_export.sql  general_catalog: the ConfigItem classes
+                                   (ITSM::ConfigItem::Class), deployment
+                                   states (ITSM::ConfigItem::DeploymentState)
+                                   and every other catalog item
+  old_otrs_users_full.txt          the users table (id, login, first_name,
+                                   last_name, ...) as mysql -B TSV, XML, JSON
+                                   or mysqldump SQL
+  otrs_users.json                  user export (Login, Firstname, Lastname,
+                                   and UserID where present)
+
+Any SQL source may also hold the users and roles tables. The exports are
+streamed with the mysql_dump.py readers, nothing is loaded into a database.
+
+Maps (all {id: name} with int IDs, except user_name):
+
+  class       ConfigItem class ID -> class name
+  depl_state  deployment state ID -> state name
+  catalog     any general_catalog ID -> item name
+  catalog_class  general_catalog ID -> its general_catalog_class
+  user        user ID -> login
+  role        role ID -> role name
+  user_name   login -> "Firstname Lastname"
+
+The result is cached with marshal in id_maps.cache next to the sources and
+reused as long as no source changed size or mtime.
+
+Usage: python3 id_maps.py [--rebuild] [--show MAP]
+"""
+import argparse
+import marshal
+import os
+
+from cmdb_export import BASE_DIR
+from mojibake import fix_mojibake
+from mysql_dump import detect_format, read_json, read_sql, read_tsv, read_xml
+
+SOURCES = [
+    f'{BASE_DIR}/otrs_general_catalog_export.sql',
+    f'{BASE_DIR}/old_otrs_users_full.txt',
+    f'{BASE_DIR}/otrs_users.json',
+]
+CACHE_FILE = f'{BASE_DIR}/id_maps.cache'
+CACHE_VERSION = 2
+
+MAPS = ('class', 'depl_state', 'catalog', 'catalog_class', 'user', 'role', 'user_name')
+
+CLASS_CATALOG = 'ITSM::ConfigItem::Class'
+DEPL_STATE_CATALOG = 'ITSM::ConfigItem::DeploymentState'
+
+ROW_READERS = {'tsv': read_tsv, 'xml': read_xml, 'json': read_json}
+
+def _pick(row, *keys):
+    for key in keys:
+        v = row.get(key)
+        if v not in (None, ''):
+            return v
+    return None
+
+def _int(v):
+    try: return int(v)
+    except (TypeError, ValueError): return None
+
+def add_catalog(maps, row):
+    item_id = _int(row.get('id'))
+    if item_id is None: return
+    name = row.get('name') or ''
+    maps['catalog'][item_id] = name
+    if row.get('general_catalog_class'):
+        maps['catalog_class'][item_id] = row['general_catalog_class']
+    if row.get('general_catalog_class') == CLASS_CATALOG:
+        maps['class'][item_id] = name
+    elif row.get('general_catalog_class') == DEPL_STATE_CATALOG:
+        maps['depl_state'][item_id] = name
+
+def add_user(maps, row):
+    # users table columns or the user export's keys
+    login = _pick(row, 'login', 'Login', 'UserLogin')
+    if not login: return
+    user_id = _int(_pick(row, 'id', 'UserID', 'ID'))
+    if user_id is not None:
+        maps['user'][user_id] = login
+    first = fix_mojibake(_pick(row, 'first_name', 'Firstname', 'UserFirstname') or '')
+    last = fix_mojibake(_pick(row, 'last_name', 'Lastname', 'UserLastname') or '')
+    full = f"{first} {last}".strip()
+    if full:
+        maps['user_name'][login] = full
+
+def add_role(maps, row):
+    role_id = _int(row.get('id'))
+    if role_id is not None and row.get('name'):
+        maps['role'][role_id] = row['name']
+
+TABLES = {'general_catalog': add_catalog, 'users': add_user, 'roles': add_role}
+
+def build(sources=SOURCES):
+    maps = {name: {} for name in MAPS}
+    for path in sources:
+        if not os.path.exists(path) or not os.path.getsize(path):
+            continue
+        fmt = detect_format(path)
+        if fmt == 'sql':
+            for table, row in read_sql(path, TABLES):
+                TABLES[table](maps, row)
+        else:
+            # Row exports other than SQL are user lists
+            for row in ROW_READERS[fmt](path):
+                add_user(maps, row)
+    return maps
+
+def catalog_values(maps):
+    # general_catalog_class -> set of its item names
+    values = {}
+    for item_id, cls in maps['catalog_class'].items():
+        values.setdefault(cls, set()).add(maps['catalog'].get(item_id, ''))
+    return values
+
+def fingerprint(sources):
+    # (path, size, mtime_ns) of every source present
+    found = []
+    for path in sources:
+        try: st = os.stat(path)
+        except OSError: continue
+        found.append((os.path.abspath(path), st.st_size, st.st_mtime_ns))
+    return found
+
+def load(sources=SOURCES, cache_file=CACHE_FILE, rebuild=False):
+    # The maps, from the cache when it is current, else rebuilt and cached
+    key = [CACHE_VERSION, fingerprint(sources)]
+    if not rebuild and cache_file and os.path.exists(cache_file):
+        try:
+            with open(cache_file, 'rb') as f:
+                cached = marshal.load(f)
+            if cached.get('key') == key:
+                return cached['maps']
+        except (OSError, EOFError, ValueError, TypeError, AttributeError):
+            pass
+    maps = build(sources)
+    if cache_file:
+        tmp = f'{cache_file}.tmp'
+        try:
+            with open(tmp, 'wb') as f:
+                marshal.dump({'key': key, 'maps': maps}, f)
+            os.replace(tmp, cache_file)
+        except OSError:
+            pass
+    return maps
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the old OTRS ID -> name maps from the database exports.")
+    parser.add_argument('--rebuild', action='store_true', help="ignore the cache")
+    parser.add_argument('--show', choices=MAPS, help="print one map as ID;Name")
+    args = parser.parse_args(argv)
+
+    maps = load(rebuild=args.rebuild)
+    if args.show:
+        for key, name in sorted(maps[args.show].items()):
+            print(f"{key};{name}")
+        return
+    for name in MAPS:
+        print(f"{name}: {len(maps[name])}")
+
+if __name__ == '__main__':
+    main()
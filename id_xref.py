@@ -0,0 +1,143 @@
+"""ID cross-reference for the CMDB export: which rows reference ConfigItem ID X.
+
+A reference is a numeric Content of a Version attribute (Owner, Vladelec,
+Vendor, ...). Answers come from either
+
+  - one streaming pass over the export for any number of IDs at once: each
+    row is read and dropped, and only rows whose raw text has a wanted
+    "Content":"<id>" get their data_json decoded; or
+  - a prebuilt inverted index (SQLite, next to the export like the People
+    index, rebuilt when the export changes), for repeated lookups.
+
+Either way memory does not grow with the size of the export. Rows are
+numbered from 1 in export order, header not counted; a record too short to
+read is skipped but keeps its number.
+
+Usage: python3 id_xref.py [--source CSV] [--index | --rebuild] [--ids-file F] ID ...
+"""
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+
+from cmdb_export import SOURCE_FILE, numbered_rows
+from people_index import SourceIndex, source_meta
+
+_CONTENT_ID = re.compile(r'"Content":"?(\d+)')
+_ATTR = re.compile(r"\{'([^']*)'\}\[\d+\]$")
+
+BATCH = 50000
+# Bumped when the schema or the row numbering changes, so older index files get rebuilt
+FORMAT = '2'
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE refs (id TEXT, row INTEGER, cls TEXT, attr TEXT);
+"""
+
+def row_refs(raw, wanted=None):
+    # (id, attribute) of the numeric Content values of one data_json, in
+    # document order. With wanted, only those IDs, and rows that cannot
+    # contain any of them are not decoded at all. Raises ValueError on
+    # undecodable JSON.
+    if wanted is not None and wanted.isdisjoint(_CONTENT_ID.findall(raw)):
+        return []
+    refs = []
+    def hook(obj):
+        content = obj.get('Content')
+        if content is not None:
+            content = str(content)
+            if content.isdigit() and (wanted is None or content in wanted):
+                m = _ATTR.search(obj.get('TagKey', ''))
+                refs.append((content, m.group(1) if m else ''))
+        return None
+    json.loads(raw, object_hook=hook)
+    return refs
+
+def scan(source_file, ids):
+    # Yields (id, row, cls, attr) for every reference to one of ids, in
+    # export order, from a single pass
+    wanted = set(map(str, ids))
+    for n, cls, name, status, raw in numbered_rows(source_file):
+        try: refs = row_refs(raw, wanted)
+        except ValueError: continue
+        for content, attr in refs:
+            yield content, n, cls, attr
+
+def xref_path(source_file):
+    return f'{source_file}.xref.db'
+
+def build(source_file=SOURCE_FILE, path=None):
+    path = path or xref_path(source_file)
+    meta = source_meta(source_file)
+    tmp = f'{path}.tmp'
+    if os.path.exists(tmp): os.remove(tmp)
+    db = sqlite3.connect(tmp)
+    with db:
+        db.executescript(SCHEMA)
+        batch = []
+        for n, cls, name, status, raw in numbered_rows(source_file):
+            try: refs = row_refs(raw)
+            except ValueError: continue
+            batch.extend((content, n, cls, attr) for content, attr in refs)
+            if len(batch) >= BATCH:
+                db.executemany("INSERT INTO refs VALUES (?, ?, ?, ?)", batch)
+                batch.clear()
+        db.executemany("INSERT INTO refs VALUES (?, ?, ?, ?)", batch)
+        # Indexed after loading, which is much cheaper than maintaining it per insert
+        db.execute("CREATE INDEX refs_id ON refs (id, row)")
+        db.executemany("INSERT INTO meta VALUES (?, ?)", meta + [('format', FORMAT)])
+    db.close()
+    os.replace(tmp, path)
+    return XrefIndex(path)
+
+class XrefIndex(SourceIndex):
+    index_path = staticmethod(xref_path)
+    build = staticmethod(build)
+    format = FORMAT
+
+    def lookup(self, ids):
+        # Same result as scan(), in the same order (rowid is insertion order)
+        with self.db:
+            self.db.execute("CREATE TEMP TABLE IF NOT EXISTS wanted (id TEXT PRIMARY KEY)")
+            self.db.execute("DELETE FROM wanted")
+            self.db.executemany("INSERT OR IGNORE INTO wanted VALUES (?)", [(str(i),) for i in ids])
+        yield from self.db.execute("SELECT r.id, r.row, r.cls, r.attr FROM refs r JOIN wanted w ON r.id = w.id ORDER BY r.rowid")
+
+def read_ids(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="List the export rows that reference the given ConfigItem IDs.")
+    parser.add_argument('ids', nargs='*', metavar='ID')
+    parser.add_argument('--source', default=SOURCE_FILE)
+    parser.add_argument('--ids-file', help="file with one ID per line")
+    parser.add_argument('--index', action='store_true', help="answer from the inverted index, building it if needed")
+    parser.add_argument('--rebuild', action='store_true', help="rebuild the inverted index (implies --index)")
+    args = parser.parse_args(argv)
+
+    ids = args.ids + (read_ids(args.ids_file) if args.ids_file else [])
+    if not ids and not args.rebuild:
+        parser.error("no IDs given")
+
+    if args.index or args.rebuild:
+        index = XrefIndex.open(args.source, rebuild=args.rebuild)
+        refs = index.lookup(ids)
+    else:
+        index = None
+        refs = scan(args.source, ids)
+
+    found = {}
+    out = sys.stdout
+    out.write("ID;Row;Class;Attribute\n")
+    for content, n, cls, attr in refs:
+        out.write(f"{content};{n};{cls};{attr}\n")
+        found[content] = found.get(content, 0) + 1
+    if index: index.close()
+    print(f"{sum(found.values())} references to {len(found)} of {len(set(ids))} IDs.", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,221 @@
+"""Checks generated import CSVs against the Znuny class definitions.
+
+Catches what Znuny would reject before an import is tried. The definitions
+(tools_definition.yml, passport_def.yml, certificate_def.yml,
+measuring_tools_definition.yml, as named in field_mapping.yml) are loaded
+once and compiled into one check list per column:
+
+  Required          the value is not empty
+  MaxLength         the value is not longer
+  Date              YYYY-MM-DD
+  GeneralCatalog    the value is an item of the catalog class (from the
+                    general_catalog export, see id_maps.py)
+  CIClassReference  the value names a CI of the referenced class that is
+                    imported (the first column of its import CSV, for People
+                    people_to_import.csv)
+
+plus the common columns: Name is required (at most 250 characters), DeplState
+and InciState must be catalog items. Catalog classes and referenced classes
+with no known values are reported as unchecked rather than failed.
+
+Which column holds which attribute: a file named like an output of
+field_mapping.yml has that class's column order and no header. Any other
+file needs a header row of attribute keys (tools_ready.csv and the like) or
+--columns; its class follows --class or the file name. Files may be
+compressed (.gz / .xz / .zst, see compressed.py).
+
+Usage: python3 import_validator.py FILE... [--class CLS] [--columns Name,DeplState,...]
+                                   [--delimiter ';'] [--max-errors N]
+"""
+import argparse
+import csv
+import os
+import re
+import sys
+
+from cmdb_export import BASE_DIR
+from compressed import find_compressed, open_file, strip_suffix
+from field_spec import load_spec
+from id_maps import catalog_values, load as load_id_maps
+
+NAME_MAX_LENGTH = 250
+DEPL_STATE_CATALOG = 'ITSM::ConfigItem::DeploymentState'
+INCI_STATE_CATALOG = 'ITSM::Core::IncidentState'
+
+# Common columns of every class, as definition Input blocks
+COMMON = {
+    'Name': {'Type': 'Text', 'Required': 1, 'MaxLength': NAME_MAX_LENGTH},
+    'DeplState': {'Type': 'GeneralCatalog', 'Class': DEPL_STATE_CATALOG, 'Required': 1},
+    'InciState': {'Type': 'GeneralCatalog', 'Class': INCI_STATE_CATALOG, 'Required': 1},
+}
+
+# Referenced class -> import CSV whose first column names its CIs
+REFERENCE_SOURCES = {'People': 'people_to_import.csv'}
+
+# File name prefix -> class, for files that are not field_mapping.yml outputs
+CLASS_PREFIXES = [('measuring', 'MeasuringTools'), ('tools', 'Tools'), ('passport', 'Passport'),
+                  ('certificate', 'Certificate'), ('approvals', 'Approvals'), ('keys', 'Keys'), ('ppe', 'PPE')]
+
+_DATE = re.compile(r'\d{4}-\d{2}-\d{2}\Z')
+
+class SchemaError(ValueError):
+    pass
+
+def reference_names(cls, base_dir=BASE_DIR):
+    # Names of the CIs of cls that are imported, or None when unknown
+    source = REFERENCE_SOURCES.get(cls)
+    path = find_compressed(os.path.join(base_dir, source)) if source else None
+    if not path or not os.path.exists(path):
+        return None
+    with open_file(path, 'r', newline='') as f:
+        return {row[0] for row in csv.reader(f, delimiter=';') if row}
+
+class Schemas:
+    # Value sets shared by every file checked: catalog items per catalog
+    # class and CI names per referenced class, each loaded once
+    def __init__(self, spec=None, base_dir=BASE_DIR):
+        self.spec = spec if spec is not None else load_spec()
+        self.base_dir = base_dir
+        self.catalogs = catalog_values(load_id_maps())
+        self.references = {}
+
+    def definition(self, cls):
+        if cls not in self.spec:
+            raise SchemaError(f"unknown class {cls!r}")
+        return dict(self.spec[cls].definition)
+
+    def reference(self, cls):
+        if cls not in self.references:
+            self.references[cls] = reference_names(cls, self.base_dir)
+        return self.references[cls]
+
+    def compile(self, cls, columns):
+        # columns: attribute key (or None) per CSV column. Returns the checks
+        # [(index, key, required, max_length, is_date, allowed, unchecked)]
+        definition = self.definition(cls)
+        checks = []
+        for index, key in enumerate(columns):
+            if not key: continue
+            spec = COMMON.get(key) or definition.get(key)
+            if spec is None: continue
+            input_type = spec.get('Type')
+            allowed = unchecked = None
+            if input_type == 'GeneralCatalog':
+                allowed = self.catalogs.get(spec.get('Class'))
+                if allowed is None: unchecked = f"catalog {spec.get('Class')}"
+            elif input_type == 'CIClassReference':
+                allowed = self.reference(spec.get('ReferencedCIClassName'))
+                if allowed is None: unchecked = f"{spec.get('ReferencedCIClassName')} references"
+            max_length = spec.get('MaxLength')
+            checks.append((index, key, bool(int(spec.get('Required') or 0)),
+                           int(max_length) if max_length else None,
+                           input_type == 'Date', allowed, unchecked))
+        return checks
+
+def class_for_file(path, spec):
+    base = os.path.basename(strip_suffix(path))
+    for cls, class_spec in spec.items():
+        if class_spec.output == base:
+            return cls, class_spec.column_keys()
+    lower = base.lower()
+    for prefix, cls in CLASS_PREFIXES:
+        if lower.startswith(prefix) and cls in spec:
+            return cls, None
+    return None, None
+
+class Report:
+    def __init__(self, path, max_errors):
+        self.path = path
+        self.max_errors = max_errors
+        self.rows = 0
+        self.errors = 0
+        self.counts = {}
+        self.unchecked = set()
+        self.shown = []
+
+    def error(self, line, key, problem, value):
+        self.errors += 1
+        self.counts[(key, problem)] = self.counts.get((key, problem), 0) + 1
+        if len(self.shown) < self.max_errors:
+            self.shown.append(f"{self.path}:{line}: {key}: {problem}: {value!r}")
+
+def validate(path, schemas, cls=None, columns=None, delimiter=';', max_errors=20):
+    # Streams one CSV through the compiled checks and returns its Report
+    report = Report(path, max_errors)
+    file_cls, file_columns = class_for_file(path, schemas.spec)
+    cls = cls or file_cls
+    if cls is None:
+        raise SchemaError("cannot tell the class from the file name, use --class")
+    known = set(COMMON) | set(schemas.definition(cls))
+    with open_file(path, 'r', newline='') as f:
+        reader = csv.reader(f, delimiter=delimiter)
+        first = next(reader, None)
+        if first is None:
+            return report
+        # A header row names mostly known attributes; the rest go unchecked
+        if columns is None and sum(c in known for c in first) * 2 > len(first):
+            columns, pending = first, None
+            report.unchecked.update(f"column {c}" for c in first if c and c not in known)
+        else:
+            columns, pending = columns or (file_columns if cls == file_cls else None), first
+        if columns is None:
+            raise SchemaError("no header row and no known column order, use --columns")
+        checks = schemas.compile(cls, columns)
+        report.unchecked.update(c[6] for c in checks if c[6])
+        width = len(columns)
+        rows = reader if pending is None else _prepend(pending, reader)
+        for row in rows:
+            line = reader.line_num
+            report.rows += 1
+            if len(row) != width:
+                report.error(line, '-', f"{len(row)} columns, expected {width}", delimiter.join(row)[:80])
+                continue
+            for index, key, required, max_length, is_date, allowed, unchecked in checks:
+                value = row[index]
+                if not value:
+                    if required: report.error(line, key, "required", value)
+                    continue
+                if max_length and len(value) > max_length:
+                    report.error(line, key, f"longer than {max_length}", value)
+                if is_date and not _DATE.match(value):
+                    report.error(line, key, "not a YYYY-MM-DD date", value)
+                if allowed is not None and value not in allowed:
+                    report.error(line, key, "unknown value", value)
+    return report
+
+def _prepend(row, rows):
+    yield row
+    yield from rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check import CSVs against the Znuny class definitions.")
+    parser.add_argument('files', nargs='+')
+    parser.add_argument('--class', dest='cls', help="class of the files (default: from the file name)")
+    parser.add_argument('--columns', help="comma-separated attribute key per column, empty to skip a column")
+    parser.add_argument('--delimiter', default=';')
+    parser.add_argument('--max-errors', type=int, default=20, help="errors listed per file")
+    args = parser.parse_args(argv)
+
+    schemas = Schemas()
+    columns = args.columns.split(',') if args.columns else None
+    failed = False
+    for path in args.files:
+        try:
+            report = validate(path, schemas, args.cls, columns, args.delimiter, args.max_errors)
+        except (SchemaError, OSError) as e:
+            print(f"{path}: {e}", file=sys.stderr)
+            failed = True
+            continue
+        for shown in report.shown:
+            print(shown)
+        status = "OK" if not report.errors else f"{report.errors} errors"
+        print(f"{path}: {report.rows} rows, {status}")
+        for (key, problem), n in sorted(report.counts.items()):
+            print(f"  {key}: {problem} x{n}")
+        for what in sorted(report.unchecked):
+            print(f"  unchecked: {what} (no known values)")
+        failed = failed or bool(report.errors)
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
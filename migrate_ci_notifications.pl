@@ -15,6 +15,12 @@ my $NotificationsRaw = <<'JSON_DATA';
 [DATA_PLACEHOLDER]
 JSON_DATA
 
+# Distinct logins, roles, classes and DeplStates the notifications refer to
+# (notifications_lookups.json); empty when the script was generated without it
+my $LookupsRaw = <<'LOOKUPS_DATA';
+[LOOKUPS_PLACEHOLDER]
+LOOKUPS_DATA
+
 local $Kernel::OM = Kernel::System::ObjectManager->new();
 my $JSONObject = $Kernel::OM->Get('Kernel::System::JSON');
 my $DBObject   = $Kernel::OM->Get('Kernel::System::DB');
@@ -25,6 +31,7 @@ my $RoleObject = $Kernel::OM->Get('Kernel::System::Role');
 my $ValidObject = $Kernel::OM->Get('Kernel::System::Valid');
 
 my $Notifications = $JSONObject->Decode(Data => $NotificationsRaw);
+my $Lookups = $LookupsRaw =~ /\S/ ? $JSONObject->Decode(Data => $LookupsRaw) : undef;
 my $ValidID = $ValidObject->ValidLookup(Valid => 'valid');
 
 # Pre-fetch Class IDs
@@ -41,6 +48,46 @@ for my $ID (keys %$DeplStateList) {
     $DeplStateMap{$DeplStateList->{$ID}} = $ID;
 }
 
+# Users and roles are looked up once per distinct login / role name
+my %UserIDByLogin;
+my %RoleIDByName;
+
+sub UserIDForLogin {
+    my $Login = shift;
+    if (!exists $UserIDByLogin{$Login}) {
+        my %U = $UserObject->GetUserData(User => $Login);
+        $UserIDByLogin{$Login} = $U{UserID};
+    }
+    return $UserIDByLogin{$Login};
+}
+
+sub RoleIDForName {
+    my $RoleName = shift;
+    if (!exists $RoleIDByName{$RoleName}) {
+        $RoleIDByName{$RoleName} = $RoleObject->RoleLookup(Role => $RoleMapOverride{$RoleName} || $RoleName);
+    }
+    return $RoleIDByName{$RoleName};
+}
+
+# With the manifest everything is resolved up front, and what the target
+# system lacks is reported once instead of per notification
+if ($Lookups) {
+    print "Resolving " . scalar(@{$Lookups->{Logins} || []}) . " logins and "
+        . scalar(@{$Lookups->{Roles} || []}) . " roles...\n";
+    for my $Login (@{$Lookups->{Logins} || []}) {
+        print "Warning: User '$Login' not found.\n" if !UserIDForLogin($Login);
+    }
+    for my $RoleName (@{$Lookups->{Roles} || []}) {
+        print "Warning: Role '$RoleName' not found.\n" if !RoleIDForName($RoleName);
+    }
+    for my $ClassName (@{$Lookups->{Classes} || []}) {
+        print "Warning: Class '$ClassName' not found.\n" if !$ClassMap{$ClassName};
+    }
+    for my $StateName (@{$Lookups->{DeplStates} || []}) {
+        print "Warning: DeplState '$StateName' not found.\n" if !$DeplStateMap{$StateName};
+    }
+}
+
 print "Starting migration of " . scalar(@$Notifications) . " notifications...\n";
 
 for my $Notif (@$Notifications) {
@@ -55,8 +102,7 @@ for my $Notif (@$Notifications) {
     }
 
     # 2. Resolve UserID
-    my %UserData = $UserObject->GetUserData(User => $Notif->{create_by_login});
-    my $UserID = $UserData{UserID} || 1; # Fallback to root
+    my $UserID = UserIDForLogin($Notif->{create_by_login}) || 1; # Fallback to root
 
     # 3. Handle JSON fields (Filter and Recipients)
     my $Filter = $JSONObject->Decode(Data => $Notif->{filter});
@@ -78,15 +124,15 @@ for my $Notif (@$Notifications) {
     if ($Recipients->{'Recipient.Agents'}) {
         my @NewUserIDs;
         for my $Login (@{$Recipients->{'Recipient.Agents'}}) {
-            my %U = $UserObject->GetUserData(User => $Login);
-            push @NewUserIDs, $U{UserID} if $U{UserID};
+            my $UID = UserIDForLogin($Login);
+            push @NewUserIDs, $UID if $UID;
         }
         $Recipients->{'Recipient.Agents'} = \@NewUserIDs if @NewUserIDs;
     }
     if ($Recipients->{'Recipient.Roles'}) {
         my @NewRoleIDs;
         for my $RoleName (@{$Recipients->{'Recipient.Roles'}}) {
-            my $RID = $RoleObject->RoleLookup(Role => $RoleMapOverride{$RoleName} || $RoleName);
+            my $RID = RoleIDForName($RoleName);
             push @NewRoleIDs, $RID if $RID;
         }
         $Recipients->{'Recipient.Roles'} = \@NewRoleIDs if @NewRoleIDs;
@@ -0,0 +1,300 @@
+"""Single-pass CMDB migration engine.
+
+Reads old_otrs_cmdb_export_v2.csv once and feeds every row to the emitter of
+its class, compiled from field_mapping.yml by field_spec.py, writing all
+import CSVs in the same pass. Owner names are resolved to logins by
+owner_resolver.py, over the People index (people_index.py) when it is fresh
+for the export. Otherwise People rows are collected on the way; since an
+owner may be referenced before its People row shows up, emitted rows are
+then spooled with their owner candidates and the login is filled in when the
+spool is flushed to the output CSVs.
+
+With --jobs N the export is split into record-aligned chunks that are
+converted in N processes and merged back in file order, as a pipeline
+(pipeline.py): a reader thread reads the chunks ahead, the pool converts
+them and the writer works through the results, with bounded queues in
+between. --metrics prints how busy each stage was. With --delta only
+rows that are new or changed since the previous --delta run are written (to
+*_delta.csv), plus a deletions.csv of rows that disappeared, each with its
+hash and old row as JSON since Names repeat (see delta_state.py).
+
+Records that cannot be converted (data_json that does not decode, no
+Version, no name) are not dropped but written to a quarantine file with a
+reason code, and with --strict-owners so are the ones whose owner does not
+resolve instead of going to sz (see quarantine.py). After a fix --retry
+converts only the quarantined records, to *_retry.csv, and quarantines again
+what still fails.
+
+The export may be a .gz / .xz / .zst file, and --compress (or
+ZNUNY_COMPRESS) writes the CSVs compressed, e.g. tools_for_import_final.csv.gz
+(see compressed.py).
+
+Usage: python3 migrate_export.py [--source CSV] [--out-dir DIR] [--only Approvals,Tools] [--jobs N [--metrics]] [--delta]
+                                 [--compress gz|xz|zst] [--quarantine FILE] [--strict-owners] [--retry]
+"""
+import argparse
+import csv
+import marshal
+import multiprocessing
+import os
+import tempfile
+
+from cmdb_export import BASE_DIR, SOURCE_FILE, iter_export, iter_export_data, read_chunks
+from compressed import find_compressed, open_file, output_path
+from delta_state import DeltaState
+from field_spec import compile_spec
+from mojibake import fix_mojibake
+from owner_resolver import OwnerResolver
+from people_index import PeopleIndex
+from pipeline import Pipeline
+from quarantine import Quarantine, Reject, decode_version, reason_of
+
+_EMPTY = (None, {})
+WRITE_BATCH = 1000
+
+# class -> (emitter, output file, name column), compiled from field_mapping.yml.
+# Each emitter gets (name_orig, status, version) and returns
+# (row, owner_column, owner_candidates) or None when the row has no name.
+# The owner column is filled with the login of the first candidate that
+# owner_resolver.py resolves, or "sz" (admin) when none does.
+EMITTERS = compile_spec()
+
+def collect_person(v, name_to_login):
+    fio = v.get('FIO', _EMPTY)[1]
+    login = fio.get('ResolvedUser', '')
+    full_name = fio.get('ResolvedUserFull', '')
+    if login and full_name: name_to_login[full_name] = login
+
+def load_people(index, resolver, source_file, reject=None):
+    # Fills resolver from a People index and closes it; reject gets the
+    # People records the index left out, as emit_rows() would have
+    name_to_login = index.name_to_login()
+    if reject:
+        for record in index.rejects(): reject(*record)
+    index.close()
+    resolver.load_sources(name_to_login, source_file)
+
+def emit_rows(source_file, emitters, name_to_login=None, reject=None, keep_source=False):
+    # Yields (cls, row, owner_col, candidates, source). When name_to_login is
+    # given, People rows are collected into it on the way.
+    classes = set(emitters)
+    if name_to_login is not None: classes.add('People')
+    return convert_rows(iter_export(source_file, classes), emitters, name_to_login, reject, keep_source)
+
+def convert_rows(rows, emitters, name_to_login=None, reject=None, keep_source=False):
+    # reject(cls, name, status, raw, reason, detail) gets every record that
+    # cannot be converted (see quarantine.py). source is (name, status, raw)
+    # with keep_source, for quarantining the record later on, else None.
+    for r in rows:
+        try:
+            v = decode_version(r.raw)
+            if r.cls == 'People':
+                collect_person(v, name_to_login)
+                continue
+            out = emitters[r.cls][0](r.name, r.status, v)
+            if out is None: raise Reject('empty_name')
+        except Exception as e:
+            if reject: reject(r.cls, r.name, r.status, r.raw, *reason_of(e))
+            continue
+        row, owner_col, candidates = out
+        yield r.cls, row, owner_col, candidates, (r.name, r.status, r.raw) if keep_source else None
+
+def _convert_chunk(task):
+    # (records, rejects) of one chunk
+    classes, start, data, keep_source = task
+    emitters = {cls: EMITTERS[cls] for cls in classes}
+    rejects = []
+    records = list(convert_rows(iter_export_data(data, emitters, skip_header=start == 0), emitters,
+                                reject=lambda *reject: rejects.append(reject), keep_source=keep_source))
+    return records, rejects
+
+def emit_parallel(source_file, emitters, jobs, chunk_size, metrics=None, reject=None, keep_source=False):
+    # Same records as emit_rows(), through a pipeline: a reader thread reads
+    # the chunks, a process pool converts them and the caller writes the
+    # records, in file order so the output stays deterministic. The
+    # pipeline's report lines are added to metrics.
+    classes = list(emitters)
+    tasks = ((classes, start, data, keep_source) for start, data in read_chunks(source_file, chunk_size))
+    with multiprocessing.Pool(jobs) as pool:
+        pipe = Pipeline(tasks, _convert_chunk, workers=jobs, pool=pool, size=lambda task: len(task[2]))
+        for records, rejects in pipe.results():
+            if reject:
+                for r in rejects: reject(*r)
+            yield from records
+    if metrics is not None:
+        metrics.extend(pipe.report())
+
+def iter_spool(spool):
+    spool.seek(0)
+    while True:
+        try: yield marshal.load(spool)
+        except EOFError: return
+
+def delta_output(output):
+    return output[:-len('.csv')] + '_delta.csv'
+
+def retry_output(output):
+    return output[:-len('.csv')] + '_retry.csv'
+
+def output_name(output, delta=False, compression=None, retry=False):
+    # *_delta.csv with --delta, *_retry.csv with --retry, plus the suffix of
+    # compression (default: ZNUNY_COMPRESS, see compressed.py)
+    if delta: output = delta_output(output)
+    elif retry: output = retry_output(output)
+    return output_path(output, compression)
+
+def write_outputs(records, emitters, resolver, out_dir, delta=None, compression=None, reject=None, retry=False):
+    # With a DeltaState only new or changed rows are written, to *_delta.csv,
+    # and rows gone since the previous run are listed in deletions.csv.
+    # Records that carry their source go to reject when no owner resolves.
+    # A retry writes the *_retry.csv of the classes that have rows only.
+    counts = dict.fromkeys(emitters, 0)
+    files, writers = {}, {}
+
+    def writer(cls):
+        if cls not in writers:
+            files[cls] = open_file(f'{out_dir}/{output_name(emitters[cls][1], delta, compression, retry)}', 'w', newline='')
+            writers[cls] = csv.writer(files[cls], delimiter=';')
+        return writers[cls]
+
+    try:
+        if not retry:
+            for cls in emitters: writer(cls)
+        # Rows are written WRITE_BATCH at a time per class
+        pending = {cls: [] for cls in emitters}
+        for cls, row, owner_col, candidates, source in records:
+            login = resolver.resolve_first(candidates)
+            if not login and source:
+                reject(cls, *source, 'unresolved_owner', ', '.join(c for c in candidates if c))
+                if delta: delta.hold(cls, row[emitters[cls][2]])
+                continue
+            row[owner_col] = login or "sz"
+            if delta and not delta.check(cls, row[emitters[cls][2]], row): continue
+            batch = pending[cls]
+            batch.append(row)
+            if len(batch) == WRITE_BATCH:
+                writer(cls).writerows(batch)
+                batch.clear()
+            counts[cls] += 1
+        for cls, batch in pending.items():
+            if batch: writer(cls).writerows(batch)
+    finally:
+        for f in files.values(): f.close()
+
+    if delta:
+        with open_file(f'{out_dir}/{output_path("deletions.csv", compression)}', 'w', newline='') as f:
+            writer = csv.writer(f, delimiter=';')
+            writer.writerow(['Class', 'Name', 'Hash', 'Row'])
+            writer.writerows(delta.deletions(emitters))
+        delta.commit(emitters)
+    return counts
+
+def rejecter(quarantine=None, delta=None):
+    # reject() for convert_rows(): quarantines the record and, in delta mode,
+    # holds an old row for it, so it is not reported as deleted while it is
+    # still in the export. Unresolved owners are held by write_outputs(),
+    # which knows their Name.
+    if not (quarantine or delta): return None
+    def reject(cls, name, status, raw, reason, detail=''):
+        if quarantine: quarantine.add(cls, name, status, raw, reason, detail)
+        if delta and reason != 'unresolved_owner':
+            delta.hold(cls, fix_mojibake(name) if name.strip() else None)
+    return reject
+
+def run(source_file=SOURCE_FILE, out_dir=BASE_DIR, classes=None, use_index=True, jobs=1, chunk_size=8 << 20, delta=None,
+        resolver=None, metrics=None, compression=None, quarantine=None, strict_owners=False, retry=False,
+        people_source=None):
+    # resolver: an OwnerResolver to fill, for its hit counters afterwards;
+    # metrics: a list for the pipeline report of a --jobs run;
+    # quarantine: a Quarantine for the records that cannot be converted, with
+    # strict_owners also those whose owner does not resolve.
+    # retry: source_file is a quarantine file, converted to *_retry.csv with
+    # the People of people_source (default: the export)
+    emitters = {cls: e for cls, e in EMITTERS.items() if classes is None or cls in classes}
+    resolver = resolver or OwnerResolver()
+    reject = rejecter(quarantine, delta)
+    keep_source = strict_owners and quarantine is not None
+    people_source = people_source or (SOURCE_FILE if retry else source_file)
+    if retry and quarantine:
+        quarantine.carry_over(source_file, emitters)
+
+    def write(records):
+        return write_outputs(records, emitters, resolver, out_dir, delta, compression, reject, retry)
+
+    # Parallel chunks cannot see each other's People rows, and a quarantine
+    # has next to none, so these need the index
+    if jobs > 1 or retry:
+        # A retry finds the People rejects carried over already
+        load_people(PeopleIndex.open(people_source), resolver, people_source, None if retry else reject)
+        if jobs > 1:
+            return write(emit_parallel(source_file, emitters, jobs, chunk_size, metrics, reject, keep_source))
+        return write(emit_rows(source_file, emitters, reject=reject, keep_source=keep_source))
+
+    # A fresh People index gives all logins up front, so rows go straight to the CSVs
+    index = PeopleIndex.open(source_file, build_missing=False) if use_index else None
+    if index:
+        load_people(index, resolver, source_file, reject)
+        return write(emit_rows(source_file, emitters, reject=reject, keep_source=keep_source))
+
+    name_to_login = {}
+    with tempfile.TemporaryFile() as spool:
+        for record in emit_rows(source_file, emitters, name_to_login, reject, keep_source):
+            marshal.dump(record, spool)
+        resolver.load_sources(name_to_login, source_file)
+        return write(iter_spool(spool))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert the OTRS CMDB export into Znuny import CSVs in one pass.")
+    parser.add_argument('--source', help="the export (default: %s), with --retry the quarantine file" % SOURCE_FILE)
+    parser.add_argument('--out-dir', default=BASE_DIR)
+    parser.add_argument('--only', help="comma-separated list of classes to convert")
+    parser.add_argument('--no-index', action='store_true', help="ignore the People index and collect logins inline")
+    parser.add_argument('--jobs', type=int, default=1, help="convert record-aligned chunks in this many processes")
+    parser.add_argument('--chunk-size', type=int, default=8, help="chunk size in MB for --jobs")
+    parser.add_argument('--compress', choices=('gz', 'xz', 'zst'),
+                        help="write the CSVs compressed (default: $ZNUNY_COMPRESS, else plain)")
+    parser.add_argument('--metrics', action='store_true', help="print the per-stage pipeline metrics of a --jobs run")
+    parser.add_argument('--delta', action='store_true', help="write only rows new or changed since the last --delta run")
+    parser.add_argument('--state', help="delta state file (default: OUT_DIR/migration_state.db)")
+    parser.add_argument('--quarantine', help="file for the rejected records (default: OUT_DIR/quarantine.csv)")
+    parser.add_argument('--strict-owners', action='store_true',
+                        help="quarantine records whose owner does not resolve instead of giving them to sz")
+    parser.add_argument('--retry', action='store_true',
+                        help="convert only the quarantined records, to *_retry.csv; what still fails stays quarantined")
+    args = parser.parse_args(argv)
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be at least 1 (MB)")
+    if args.jobs > 1 and args.no_index:
+        parser.error("--jobs needs the People index, drop --no-index")
+    if args.retry and args.delta:
+        parser.error("--retry writes *_retry.csv, it cannot be combined with --delta")
+
+    quarantine_file = args.quarantine or f'{args.out_dir}/{output_path("quarantine.csv", args.compress)}'
+    source = args.source or (find_compressed(quarantine_file) if args.retry else SOURCE_FILE)
+    if args.retry and not os.path.exists(source):
+        parser.error(f"nothing to retry, {source} does not exist")
+    classes = set(args.only.split(',')) if args.only else None
+    delta = DeltaState(args.state or f'{args.out_dir}/migration_state.db') if args.delta else None
+    resolver = OwnerResolver()
+    metrics = []
+    with Quarantine(quarantine_file) as quarantine:
+        counts = run(source, args.out_dir, classes, use_index=not args.no_index,
+                     jobs=args.jobs, chunk_size=args.chunk_size << 20, delta=delta, resolver=resolver, metrics=metrics,
+                     compression=args.compress, quarantine=quarantine, strict_owners=args.strict_owners,
+                     retry=args.retry)
+    for cls, n in counts.items():
+        if delta:
+            st = delta.stats.get(cls, {})
+            print(f"{cls}: {st.get('new', 0)} new, {st.get('changed', 0)} changed, {st.get('deleted', 0)} deleted"
+                  f" -> {output_name(EMITTERS[cls][1], True, args.compress)}")
+        elif n or not args.retry:
+            print(f"{cls}: {n} rows -> {output_name(EMITTERS[cls][1], False, args.compress, args.retry)}")
+    print(f"Owners: {resolver.stats()}")
+    print(f"Quarantined: {quarantine.summary()} -> {quarantine_file}")
+    if args.metrics:
+        for line in metrics: print(line)
+    if delta:
+        delta.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""Repair of double-encoded UTF-8 (mojibake) in the OTRS export.
+
+The export stores UTF-8 text that was read back as latin1, so "Паспорт" comes
+out as "ÐÐ°ÑÐ¿Ð¾ÑÑ". Re-encoding as latin1 and decoding as UTF-8 restores it.
+Results are identical to the per-script helper this replaces:
+
+    def fix_mojibake(s):
+        if not s: return ""
+        try: return s.encode('latin1').decode('utf-8')
+        except: return s
+"""
+from functools import lru_cache
+
+CACHE_SIZE = 65536
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _repair(s):
+    # ASCII round-trips unchanged, and anything above U+00FF cannot be
+    # latin1-encoded (e.g. text that is already proper Cyrillic), so both
+    # are returned as is without going through the exception path.
+    if s.isascii() or max(s) > '\xff':
+        return s
+    try: return s.encode('latin1').decode('utf-8')
+    except UnicodeDecodeError: return s
+
+def fix_mojibake(s):
+    if not s: return ""
+    if not isinstance(s, str):
+        # Non-string Content values came back unchanged from the old helper
+        return s
+    return _repair(s)
+
+def fix_column(values):
+    # Repairs a whole column at once; each distinct value is repaired once.
+    done = {}
+    out = []
+    for s in values:
+        fixed = done.get(s)
+        if fixed is None:
+            fixed = done[s] = fix_mojibake(s)
+        out.append(fixed)
+    return out
+
+def cache_info():
+    return _repair.cache_info()
@@ -0,0 +1,162 @@
+"""Streaming readers for the dump and export formats of the old OTRS database.
+
+  read_tsv(path)        mysql -B output: tab separated, header line, NULL for
+                        NULL, and \\n \\t \\0 \\\\ escaped (a raw CR is data,
+                        not a line end)
+  read_xml(path)        mysqldump --xml: <row><field name="...">, xsi:nil
+                        for NULL
+  read_sql(path)        mysqldump SQL: (table, row) for the INSERT INTO ...
+                        VALUES tuples, columns named by the CREATE TABLE
+  read_json(path)       JSON exports: an array of row objects, or one object
+                        per line
+
+Rows are {column: value} with SQL NULL as None (values are text, as in the
+dump), yielded one at a time, so nothing is loaded into a database or kept in
+memory beyond the current statement.
+"""
+import json
+import os
+import re
+import xml.etree.ElementTree as ET
+
+_TSV_ESCAPE = re.compile(r'\\(.)', re.S)
+_TSV_UNESCAPE = {'n': '\n', 't': '\t', '0': '\0', '\\': '\\'}
+
+def _tsv_value(v):
+    if v == 'NULL':
+        return None
+    if '\\' in v:
+        return _TSV_ESCAPE.sub(lambda m: _TSV_UNESCAPE.get(m.group(1), m.group(1)), v)
+    return v
+
+def read_tsv(path):
+    # Only LF ends a line; mysql -B escapes it inside values but not CR
+    with open(path, 'r', encoding='utf-8', newline='\n') as f:
+        header = f.readline().rstrip('\n').split('\t')
+        for line in f:
+            line = line[:-1] if line.endswith('\n') else line
+            if not line: continue
+            yield dict(zip(header, map(_tsv_value, line.split('\t'))))
+
+def read_xml(path):
+    # Each <row> is dropped from the tree once read
+    context = ET.iterparse(path, events=('start', 'end'))
+    _, root = next(context)
+    for event, elem in context:
+        if event == 'end' and elem.tag == 'row':
+            row = {}
+            for field in elem.findall('field'):
+                row[field.get('name')] = field.text
+            yield row
+            root.clear()
+
+_CREATE = re.compile(r'CREATE TABLE `([^`]+)`')
+_COLUMN = re.compile(r'\s+`([^`]+)`')
+_INSERT = re.compile(r'INSERT INTO `([^`]+)`(?: \(([^)]*)\))? VALUES ')
+_VALUE = re.compile(r"'((?:[^'\\]|\\.|'')*)'|(NULL)|([^,()]+)", re.S)
+_SQL_ESCAPE = re.compile(r"\\(.)|''", re.S)
+_SQL_UNESCAPE = {'0': '\0', 'b': '\b', 'n': '\n', 'r': '\r', 't': '\t', 'Z': '\x1a'}
+
+def _sql_string(s):
+    if '\\' not in s and "''" not in s:
+        return s
+    return _SQL_ESCAPE.sub(lambda m: "'" if m.group(1) is None else _SQL_UNESCAPE.get(m.group(1), m.group(1)), s)
+
+def sql_tuples(values):
+    # Yields the value lists of "(...),(...),...;"
+    pos, n = 0, len(values)
+    while True:
+        pos = values.find('(', pos)
+        if pos < 0: return
+        pos += 1
+        row = []
+        while pos < n:
+            m = _VALUE.match(values, pos)
+            if not m:
+                raise ValueError(f"bad SQL value at {values[pos:pos + 40]!r}")
+            if m.group(1) is not None: row.append(_sql_string(m.group(1)))
+            elif m.group(2): row.append(None)
+            else: row.append(m.group(3).strip())
+            pos = m.end()
+            if values[pos] == ',':
+                pos += 1
+            else:
+                pos += 1
+                break
+        yield row
+
+def read_sql(path, tables=None):
+    # Yields (table, {column: value}) for the rows of the given tables (all
+    # when None). mysqldump writes each INSERT statement on one line of at
+    # most net_buffer_length, so the file is read a line at a time.
+    columns = {}
+    table = None
+    with open(path, 'r', encoding='utf-8', newline='\n') as f:
+        for line in f:
+            m = _CREATE.match(line)
+            if m:
+                table = m.group(1)
+                columns[table] = []
+                continue
+            if table is not None:
+                m = _COLUMN.match(line)
+                if m and line.startswith('  `'):
+                    columns[table].append(m.group(1))
+                    continue
+                if line.startswith(')'):
+                    table = None
+                continue
+            m = _INSERT.match(line)
+            if not m or (tables is not None and m.group(1) not in tables):
+                continue
+            name = m.group(1)
+            cols = [c.strip(' `') for c in m.group(2).split(',')] if m.group(2) else columns.get(name, [])
+            for values in sql_tuples(line[m.end():]):
+                yield name, dict(zip(cols, values))
+
+def read_json(path, chunk_size=1 << 16):
+    # Array of objects, decoded one element at a time from a sliding buffer,
+    # or one object per line
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buf = f.read(chunk_size)
+        stripped = buf.lstrip()
+        if not stripped:
+            return
+        if stripped[0] != '[':
+            f.seek(0)
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+            return
+        pos = buf.index('[') + 1
+        eof = False
+        while True:
+            while pos < len(buf) and buf[pos] in ' \t\r\n,':
+                pos += 1
+            if pos < len(buf) and buf[pos] == ']':
+                return
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+            except ValueError:
+                if eof:
+                    raise
+                more = f.read(chunk_size)
+                eof = not more
+                buf = buf[pos:] + more
+                pos = 0
+                continue
+            yield obj
+            pos = end
+
+def detect_format(path):
+    # 'tsv', 'xml', 'json' or 'sql', from the extension, else the content
+    ext = os.path.splitext(path)[1].lower().lstrip('.')
+    if ext in ('tsv', 'xml', 'json', 'sql'):
+        return ext
+    with open(path, 'r', encoding='utf-8') as f:
+        head = f.read(4096).lstrip()
+    if head.startswith('<'): return 'xml'
+    if head.startswith(('[', '{')): return 'json'
+    if head.startswith(('--', '/*', 'INSERT', 'CREATE', 'DROP', 'LOCK')): return 'sql'
+    return 'tsv'
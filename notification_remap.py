@@ -0,0 +1,127 @@
+"""Remapping of old OTRS IDs in rows of ps_ci_notifications.
+
+transform() is the one remapping core of every notification reader (see
+notifications_ingest.py): class and user IDs become names, and the IDs in the
+filter and recipients JSON columns are remapped by prefix rules.
+
+A column's rules are (key prefix, {old ID: new value}) pairs. PrefixTable
+resolves each JSON key to the mappings whose prefix it starts with once, and
+remembers the answer, since the same handful of keys ("Filter.DeplStateIDs",
+"Recipient.Agents", ...) come back in every row. remap_json() then decodes a
+column once, applies every rule in a single traversal and encodes once.
+
+Same result as the old per-rule helper called once per rule in rule order:
+
+    def map_json_ids(data_str, mapping, key_prefix):
+        # json.loads, map digit IDs of keys starting with key_prefix,
+        # json.dumps(ensure_ascii=False); data_str unchanged on any error
+"""
+import json
+
+from id_maps import load as load_id_maps
+
+# Old system mappings, used for IDs the database exports do not cover (or
+# when the exports are not at hand)
+class_map = {
+    141: "Approvals",
+    198: "Medical",
+    184: "Passport",
+    281: "Keys",
+    22: "Computer",
+    216: "Certificate",
+    260: "Tools",
+    284: "MeasuringTools",
+    376: "СИЗ"
+}
+
+user_map = {
+    2: "sz",
+    11: "idedik",
+    21: "office",
+    55: "bz"
+}
+
+depl_state_map = {
+    151: "Approvals::разрешено",
+    29: "Maintenance",
+    150: "Approvals::оформление",
+    152: "Approvals::недействительно",
+    27: "Expired",
+    28: "Inactive",
+    294: "on_stock",
+    188: "Passport::действительный",
+    137: "Replace",
+    295: "СКЛАД"
+}
+
+role_map = {
+    12: "office_manager"
+}
+
+# The complete maps of the exports (id_maps.py) take precedence
+_exported = load_id_maps()
+class_map.update(_exported['class'])
+user_map.update(_exported['user'])
+depl_state_map.update(_exported['depl_state'])
+role_map.update(_exported['role'])
+
+_decode = json.JSONDecoder().decode
+_encode = json.JSONEncoder(ensure_ascii=False).encode
+
+class PrefixTable:
+    def __init__(self, rules):
+        self.rules = tuple(rules)
+        self._by_key = {}
+
+    def mappings(self, key):
+        # The mappings that apply to key, in rule order
+        found = self._by_key.get(key)
+        if found is None:
+            found = self._by_key[key] = tuple(m for prefix, m in self.rules if key.startswith(prefix))
+        return found
+
+def map_value(v, mappings):
+    # Digit IDs (as strings or numbers) are looked up as ints; anything
+    # without a mapping is kept as is
+    for mapping in mappings:
+        if isinstance(v, list):
+            v = [mapping.get(int(item), item) if str(item).isdigit() else item for item in v]
+        elif str(v).isdigit():
+            v = mapping.get(int(v), v)
+    return v
+
+def remap_json(data_str, table):
+    if not data_str or data_str == "{}" or data_str == "NULL":
+        return data_str
+    try:
+        data = _decode(data_str)
+        mappings = table.mappings
+        return _encode({k: map_value(v, mappings(k)) for k, v in data.items()})
+    except (ValueError, TypeError, AttributeError):
+        return data_str
+
+# Prefix rules per JSON column, applied in one decode/encode per column
+filter_rules = PrefixTable([("Filter", depl_state_map)])
+recipient_rules = PrefixTable([
+    ("Recipient.Agents", user_map),
+    ("Recipient.Roles", role_map),
+])
+
+def safe_int(val):
+    if val is None or val == "" or val == "NULL":
+        return 0
+    try:
+        return int(val)
+    except (TypeError, ValueError):
+        return 0
+
+def transform(row):
+    # Adds the logical names to one notification row (in place) and returns it
+    row['class_name'] = class_map.get(safe_int(row.get('class_id')), "Unknown")
+    row['create_by_login'] = user_map.get(safe_int(row.get('create_by')), "root")
+    row['change_by_login'] = user_map.get(safe_int(row.get('change_by')), "root")
+
+    # Map IDs inside JSON fields
+    row['filter'] = remap_json(row.get('filter'), filter_rules)
+    row['recipients'] = remap_json(row.get('recipients'), recipient_rules)
+    return row
@@ -0,0 +1,215 @@
+"""Ingest of the old ps_ci_notifications table into notifications_logical.json.
+
+One pipeline for every dump format: a streaming reader yields the rows as
+{column: value} dicts (SQL NULL as None), notification_remap.transform() adds
+the logical names, and the result is written as a JSON array one row at a
+time. Readers:
+
+  tsv   mysql -B output (mysql_dump.read_tsv)
+  xml   mysqldump --xml (mysql_dump.read_xml)
+  json  an array of row objects, or one object per line (mysql_dump.read_json)
+  sql   mysqldump SQL, the ps_ci_notifications INSERTs (mysql_dump.read_sql)
+
+The format follows mysql_dump.detect_format().
+
+Next to the notifications, a lookup manifest (notifications_lookups.json) is
+written: the distinct logins, role names, class names and DeplState names the
+rows refer to, sorted, with the number of references to each. The migration
+script resolves each of them once from it instead of once per reference.
+process_notifications.py (TSV) and process_notifications_xml.py (XML) are
+this pipeline with a fixed source.
+
+--bench writes the same rows in all three formats and times each reader,
+alone and with transform(), to compare the parse cost of the formats.
+
+Usage: python3 notifications_ingest.py [SOURCE] [--format tsv|xml|json|sql] [--out FILE]
+                                            [--lookups FILE]
+       python3 notifications_ingest.py --bench [SOURCE] [--rows N]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from xml.sax.saxutils import escape, quoteattr
+
+from mysql_dump import detect_format, read_json, read_sql, read_tsv, read_xml
+from notification_remap import transform
+
+SOURCES = ['old_notifications.xml', 'old_notifications.tsv', 'old_notifications.json']
+OUTPUT_FILE = 'notifications_logical.json'
+LOOKUPS_FILE = 'notifications_lookups.json'
+
+def read_sql_dump(path):
+    return (row for table, row in read_sql(path, {'ps_ci_notifications'}))
+
+READERS = {'tsv': read_tsv, 'xml': read_xml, 'json': read_json, 'sql': read_sql_dump}
+
+def default_source():
+    # First non-empty dump of the known names
+    for path in SOURCES:
+        if os.path.exists(path) and os.path.getsize(path):
+            return path
+    return SOURCES[0]
+
+def write_json_array(path, items):
+    # Same text as json.dump(list(items), f, ensure_ascii=False, indent=4),
+    # written one item at a time. Returns the number of items.
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for item in items:
+            f.write('[\n    ' if count == 0 else ',\n    ')
+            f.write(json.dumps(item, ensure_ascii=False, indent=4).replace('\n', '\n    '))
+            count += 1
+        f.write('\n]' if count else '[]')
+    return count
+
+def _decode(data):
+    try: return json.loads(data) if data else None
+    except (ValueError, TypeError): return None
+
+def _names(v):
+    if isinstance(v, list):
+        return [str(item) for item in v if item not in (None, '')]
+    return [str(v)] if v not in (None, '') else []
+
+class LookupManifest:
+    # Reference counts of the names a migrated notification needs resolved
+    # on the target system: Logins (creator and agent recipients), Roles,
+    # Classes and DeplStates (filter keys like ...DeplStateIDs)
+    KINDS = ('Logins', 'Roles', 'Classes', 'DeplStates')
+
+    def __init__(self):
+        self.counts = {kind: {} for kind in self.KINDS}
+
+    def _add(self, kind, names):
+        counts = self.counts[kind]
+        for name in names:
+            counts[name] = counts.get(name, 0) + 1
+
+    def add(self, row):
+        # Takes a transformed row and passes it on
+        self._add('Classes', _names(row.get('class_name')))
+        self._add('Logins', _names(row.get('create_by_login')))
+        recipients = _decode(row.get('recipients'))
+        if isinstance(recipients, dict):
+            self._add('Logins', _names(recipients.get('Recipient.Agents')))
+            self._add('Roles', _names(recipients.get('Recipient.Roles')))
+        filters = _decode(row.get('filter'))
+        if isinstance(filters, dict):
+            for key, v in filters.items():
+                if 'DeplStateIDs' in key:
+                    self._add('DeplStates', _names(v))
+        return row
+
+    def as_dict(self):
+        manifest = {kind: sorted(self.counts[kind]) for kind in self.KINDS}
+        manifest['References'] = {kind: dict(sorted(self.counts[kind].items())) for kind in self.KINDS}
+        return manifest
+
+    def write(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.as_dict(), f, ensure_ascii=False, indent=4)
+
+def run(source=None, out=OUTPUT_FILE, fmt=None, lookups=LOOKUPS_FILE):
+    # Returns the number of notifications written; the lookup manifest goes
+    # to lookups unless that is None
+    source = source or default_source()
+    reader = READERS[fmt or detect_format(source)]
+    rows = map(transform, reader(source))
+    if lookups is None:
+        return write_json_array(out, rows)
+    manifest = LookupManifest()
+    count = write_json_array(out, map(manifest.add, rows))
+    manifest.write(lookups)
+    return count
+
+# Writers of the three formats, for --bench
+
+def _tsv_escape(v):
+    if v is None:
+        return 'NULL'
+    return str(v).replace('\\', '\\\\').replace('\n', '\\n').replace('\t', '\\t').replace('\0', '\\0')
+
+def write_tsv(path, rows, columns):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write('\t'.join(columns) + '\n')
+        for row in rows:
+            f.write('\t'.join(_tsv_escape(row.get(c)) for c in columns) + '\n')
+
+def write_xml(path, rows, columns):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write('<?xml version="1.0"?>\n\n<resultset statement="SELECT * FROM ps_ci_notifications" '
+                'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">\n')
+        for row in rows:
+            f.write('  <row>\n')
+            for c in columns:
+                v = row.get(c)
+                if v is None:
+                    f.write(f'\t<field name={quoteattr(c)} xsi:nil="true" />\n')
+                else:
+                    f.write(f'\t<field name={quoteattr(c)}>{escape(str(v))}</field>\n')
+            f.write('  </row>\n')
+        f.write('</resultset>\n')
+
+def write_json(path, rows, columns):
+    write_json_array(path, ({c: row.get(c) for c in columns} for row in rows))
+
+def bench(source, rows, repeat=3):
+    # Seconds per format for read only and read + transform, best of repeat
+    sample = list(READERS[detect_format(source)](source))
+    if not sample:
+        raise SystemExit(f"{source} has no rows to benchmark with")
+    columns = list(sample[0])
+    data = [sample[i % len(sample)] for i in range(rows)]
+    report = {'source': source, 'rows': rows, 'formats': {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt, writer in (('tsv', write_tsv), ('xml', write_xml), ('json', write_json)):
+            path = os.path.join(tmp, f'notifications.{fmt}')
+            writer(path, data, columns)
+            reader = READERS[fmt]
+            timings = {}
+            for stage, consume in (('parse', lambda it: sum(1 for _ in it)),
+                                   ('parse_transform', lambda it: sum(1 for _ in map(transform, it)))):
+                best = None
+                for _ in range(repeat):
+                    t0 = time.perf_counter()
+                    n = consume(reader(path))
+                    seconds = time.perf_counter() - t0
+                    best = seconds if best is None else min(best, seconds)
+                if n != rows:
+                    raise SystemExit(f"{fmt}: read {n} of {rows} rows")
+                timings[stage] = best
+            size = os.path.getsize(path)
+            report['formats'][fmt] = {
+                'bytes': size,
+                'parse_seconds': round(timings['parse'], 4),
+                'parse_transform_seconds': round(timings['parse_transform'], 4),
+                'rows_per_s': round(rows / timings['parse'], 1),
+                'us_per_row': round(timings['parse'] / rows * 1e6, 2),
+                'mb_per_s': round(size / timings['parse'] / (1 << 20), 2),
+            }
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert a ps_ci_notifications dump (TSV, XML or JSON) to notifications_logical.json.")
+    parser.add_argument('source', nargs='?', help=f"dump to read (default: first non-empty of {', '.join(SOURCES)})")
+    parser.add_argument('--format', choices=sorted(READERS), help="override format detection")
+    parser.add_argument('--out', default=OUTPUT_FILE)
+    parser.add_argument('--lookups', default=LOOKUPS_FILE, help="lookup manifest to write ('' for none)")
+    parser.add_argument('--bench', action='store_true', help="time the parse cost of each format instead")
+    parser.add_argument('--rows', type=int, default=10000, help="rows per format for --bench")
+    args = parser.parse_args(argv)
+
+    if args.bench:
+        json.dump(bench(args.source or default_source(), args.rows), sys.stdout, indent=2)
+        print()
+        return
+    source = args.source or default_source()
+    fmt = args.format or detect_format(source)
+    count = run(source, args.out, fmt, args.lookups or None)
+    print(f"Successfully processed {count} notifications from {fmt.upper()}.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+"""Owner resolution: person names from the export -> Znuny logins.
+
+All known (full name, login) pairs are indexed once, in priority order:
+
+  1. the People index of the export (FIO ResolvedUserFull -> ResolvedUser)
+  2. the user maps of id_maps.py (users table, otrs_users.json)
+  3. people_data_final.json (FIO_Login, logins only)
+
+A name is then tried against each index in turn, the first hit wins:
+
+  exact     the name as written (raw or with the mojibake repaired)
+  folded    case, ё/е, Latin lookalike letters, punctuation and spacing
+            folded
+  tokens    folded, and the word order ignored ("Урусов Денис")
+  initials  initials for all but one word ("Д. Урусов", "Урусов Д.")
+  login     the name is itself a known login
+  trigram   closest folded name by trigram similarity, when it is close
+            enough and clearly ahead of the runner-up
+
+Each distinct name is resolved once and remembered. hits counts the
+lookups per strategy, plus 'miss', and 'unresolved' for the candidate lists
+of which no name resolved.
+
+Usage: python3 owner_resolver.py NAME... [--source CSV]
+"""
+import argparse
+import json
+import os
+import re
+from collections import Counter
+
+from cmdb_export import BASE_DIR, SOURCE_FILE
+from id_maps import load as load_id_maps
+from mojibake import fix_mojibake
+from people_index import PeopleIndex
+
+PEOPLE_DATA_FILE = f'{BASE_DIR}/people_data_final.json'
+
+STRATEGIES = ('exact', 'folded', 'tokens', 'initials', 'login', 'trigram')
+TRIGRAM_MIN_SCORE = 0.7
+TRIGRAM_MARGIN = 0.1
+
+_WORD = re.compile(r'\w+')
+_CYRILLIC = re.compile('[а-я]')
+# Latin letters typed for their Cyrillic lookalikes in a Cyrillic word
+_LOOKALIKES = str.maketrans('aceopxyk', 'асеорхук')
+
+def fold(name):
+    # Lower case, ё as е, Latin lookalikes in Cyrillic words as Cyrillic,
+    # words only, single spaced
+    words = _WORD.findall(fix_mojibake(name).casefold().replace('ё', 'е'))
+    return ' '.join(w.translate(_LOOKALIKES) if _CYRILLIC.search(w) else w for w in words)
+
+def trigrams(folded):
+    padded = f'  {folded} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def initials_keys(words):
+    # One key per word kept whole, the others cut to their first letter
+    return {(word, tuple(sorted(w[0] for j, w in enumerate(words) if j != i)))
+            for i, word in enumerate(words) if len(word) > 1}
+
+class OwnerResolver:
+    def __init__(self):
+        self.exact = {}
+        self.folded = {}
+        self.tokens = {}
+        self.initials = {}
+        self.logins = {}
+        self.names = []          # (folded name, trigrams, login), for trigram matching
+        self.by_trigram = {}     # trigram -> indexes into names
+        self.cache = {}
+        self.hits = Counter()
+
+    def add(self, full_name, login):
+        # Earlier pairs win over later ones for the same key
+        if not login: return
+        self.logins.setdefault(login.casefold(), login)
+        if not full_name: return
+        fixed = fix_mojibake(full_name)
+        self.exact.setdefault(full_name, login)
+        self.exact.setdefault(fixed, login)
+        key = fold(fixed)
+        if not key: return
+        if key not in self.folded:
+            grams = trigrams(key)
+            for gram in grams:
+                self.by_trigram.setdefault(gram, []).append(len(self.names))
+            self.names.append((key, len(grams), login))
+        self.folded.setdefault(key, login)
+        words = key.split()
+        self.tokens.setdefault(' '.join(sorted(words)), login)
+        for k in initials_keys(words):
+            # Two people sharing a surname and initial make the key ambiguous
+            if self.initials.setdefault(k, login) != login:
+                self.initials[k] = None
+
+    def _trigram(self, key):
+        grams = trigrams(key)
+        shared = Counter()
+        for gram in grams:
+            for i in self.by_trigram.get(gram, ()):
+                shared[i] += 1
+        scored = sorted(((2 * n / (len(grams) + self.names[i][1]), i) for i, n in shared.items()), reverse=True)
+        if not scored or scored[0][0] < TRIGRAM_MIN_SCORE:
+            return None
+        best, i = scored[0]
+        login = self.names[i][2]
+        for score, j in scored[1:]:
+            if self.names[j][2] == login: continue
+            if score > best - TRIGRAM_MARGIN: return None
+            break
+        return login
+
+    def _lookup(self, name):
+        login = self.exact.get(name) or self.exact.get(fix_mojibake(name))
+        if login: return login, 'exact'
+        key = fold(name)
+        if not key: return None, 'miss'
+        login = self.folded.get(key)
+        if login: return login, 'folded'
+        words = key.split()
+        login = self.tokens.get(' '.join(sorted(words)))
+        if login: return login, 'tokens'
+        short = [w for w in words if len(w) == 1]
+        if short and len(short) < len(words):
+            whole = [w for w in words if len(w) > 1]
+            if len(whole) == 1:
+                login = self.initials.get((whole[0], tuple(sorted(short))))
+                if login: return login, 'initials'
+        if len(words) == 1:
+            login = self.logins.get(key)
+            if login: return login, 'login'
+        login = self._trigram(key)
+        if login: return login, 'trigram'
+        return None, 'miss'
+
+    def resolve(self, name):
+        # Login for a person's name, or None
+        if not name: return None
+        found = self.cache.get(name)
+        if found is None:
+            found = self.cache[name] = self._lookup(name)
+        self.hits[found[1]] += 1
+        return found[0]
+
+    def resolve_first(self, candidates):
+        # Login of the first candidate that resolves, or None (counted as
+        # 'unresolved')
+        for name in candidates:
+            login = self.resolve(name)
+            if login: return login
+        self.hits['unresolved'] += 1
+        return None
+
+    def stats(self):
+        return ', '.join(f"{s} {self.hits[s]}" for s in STRATEGIES + ('miss', 'unresolved') if self.hits[s])
+
+    def load_sources(self, name_to_login=None, source_file=SOURCE_FILE, people_data=PEOPLE_DATA_FILE):
+        # name_to_login: People pairs already at hand (else read from the
+        # People index); the other sources are added behind them
+        if name_to_login is None:
+            index = PeopleIndex.open(source_file)
+            name_to_login = index.name_to_login()
+            index.close()
+        for full_name, login in name_to_login.items():
+            self.add(full_name, login)
+        maps = load_id_maps()
+        for login, full_name in maps['user_name'].items():
+            self.add(full_name, login)
+        for login in maps['user'].values():
+            self.add('', login)
+        if people_data and os.path.exists(people_data):
+            with open(people_data, 'r', encoding='utf-8') as f:
+                for person in json.load(f):
+                    self.add(person.get('Name', ''), person.get('FIO_Login', ''))
+        return self
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Resolve person names to Znuny logins.")
+    parser.add_argument('names', nargs='+')
+    parser.add_argument('--source', default=SOURCE_FILE)
+    args = parser.parse_args(argv)
+
+    resolver = OwnerResolver().load_sources(source_file=args.source)
+    for name in args.names:
+        login = resolver.resolve(name)
+        print(f"{name};{login or ''};{resolver.cache[name][1]}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+"""Persistent People identity index for the CMDB export.
+
+Built once per export into an SQLite file next to it and reused by every
+converter. Maps the People FIO user ID, full name (ResolvedUserFull) and login
+(ResolvedUser) to each other, and keeps the Content -> ResolvedUser and
+Content -> ResolvedName references that ref_extractor.py harvests from all
+rows (the old user_map/catalog_map and user_id_to_login/id_to_name). People
+records it cannot read are kept with a reason code for the quarantine (see
+quarantine.py).
+
+The index is rebuilt only when the export changes: size and mtime are checked
+on open, and the file hash is compared only when those differ. An index of an
+older FORMAT is rebuilt as well.
+
+Usage: python3 people_index.py [--source CSV] [--rebuild]
+"""
+import argparse
+import hashlib
+import os
+import sqlite3
+
+from cmdb_export import SOURCE_FILE, iter_export
+from quarantine import Reject, reason_of, version_of
+from ref_extractor import RefExtractor
+
+_EMPTY = (None, {})
+# Bumped when the schema changes, so older index files get rebuilt
+FORMAT = '2'
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE people (user_id TEXT, login TEXT, full_name TEXT);
+CREATE TABLE user_refs (id TEXT PRIMARY KEY, login TEXT);
+CREATE TABLE catalog_refs (id TEXT PRIMARY KEY, name TEXT);
+CREATE TABLE rejects (class TEXT, name TEXT, cur_status TEXT, data_json TEXT, reason TEXT, detail TEXT);
+CREATE INDEX people_user_id ON people (user_id);
+CREATE INDEX people_login ON people (login);
+CREATE INDEX people_full_name ON people (full_name);
+"""
+
+def index_path(source_file):
+    return f'{source_file}.people.db'
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(1 << 20):
+            h.update(chunk)
+    return h.hexdigest()
+
+def source_meta(source_file):
+    # meta rows that tie an index to the export it was built from
+    st = os.stat(source_file)
+    return [
+        ('source_size', str(st.st_size)),
+        ('source_mtime_ns', str(st.st_mtime_ns)),
+        ('source_sha256', file_hash(source_file)),
+    ]
+
+def build(source_file=SOURCE_FILE, path=None):
+    path = path or index_path(source_file)
+    meta = source_meta(source_file)
+    people, rejects, refs = [], [], RefExtractor()
+    user_map, catalog_map = refs.user_map, refs.catalog_map
+
+    # People records that cannot be read are kept as rejects (see
+    # quarantine.py); the other classes are left to their converters
+    for row in iter_export(source_file):
+        try: refs.feed(row.raw)
+        except ValueError as e:
+            if row.cls == 'People': rejects.append((row.cls, row.name, row.status, row.raw, 'bad_json', str(e)))
+            continue
+        if row.cls != 'People': continue
+        try:
+            fio = version_of(row.data).get('FIO', _EMPTY)[1]
+            people.append((str(fio.get('Content') or ''), fio.get('ResolvedUser', ''), fio.get('ResolvedUserFull', '')))
+        except (Reject, AttributeError, IndexError, KeyError, TypeError) as e:
+            rejects.append((row.cls, row.name, row.status, row.raw, *reason_of(e)))
+
+    # Build into a side file and swap it in, so readers never see a half-built index
+    tmp = f'{path}.tmp'
+    if os.path.exists(tmp): os.remove(tmp)
+    db = sqlite3.connect(tmp)
+    with db:
+        db.executescript(SCHEMA)
+        db.executemany("INSERT INTO people VALUES (?, ?, ?)", people)
+        db.executemany("INSERT INTO user_refs VALUES (?, ?)", user_map.items())
+        db.executemany("INSERT INTO catalog_refs VALUES (?, ?)", catalog_map.items())
+        db.executemany("INSERT INTO rejects VALUES (?, ?, ?, ?, ?, ?)", rejects)
+        db.executemany("INSERT INTO meta VALUES (?, ?)", meta + [('format', FORMAT)])
+    db.close()
+    os.replace(tmp, path)
+    return PeopleIndex(path)
+
+class SourceIndex:
+    # An SQLite file derived from an export, with source_meta() in its meta
+    # table. Subclasses provide index_path(source_file) and
+    # build(source_file, path); one with a format rebuilds files of another.
+    format = None
+
+    def __init__(self, path):
+        self.path = path
+        self.db = sqlite3.connect(path)
+
+    @classmethod
+    def open(cls, source_file=SOURCE_FILE, path=None, rebuild=False, build_missing=True):
+        # Returns a fresh index for source_file, (re)building it when needed.
+        # With build_missing=False a stale or missing index gives None instead.
+        path = path or cls.index_path(source_file)
+        if not rebuild and os.path.exists(path):
+            index = cls(path)
+            if index.is_fresh(source_file):
+                return index
+            index.close()
+        if not build_missing and not rebuild:
+            return None
+        return cls.build(source_file, path)
+
+    def close(self):
+        self.db.close()
+
+    def meta(self):
+        try: return dict(self.db.execute("SELECT key, value FROM meta"))
+        except sqlite3.DatabaseError: return {}
+
+    def is_fresh(self, source_file):
+        meta = self.meta()
+        st = os.stat(source_file)
+        if self.format and meta.get('format') != self.format:
+            return False
+        if meta.get('source_size') != str(st.st_size):
+            return False
+        if meta.get('source_mtime_ns') == str(st.st_mtime_ns):
+            return True
+        # Touched but possibly unchanged (e.g. copied between hosts): confirm by hash
+        if meta.get('source_sha256') != file_hash(source_file):
+            return False
+        with self.db:
+            self.db.execute("UPDATE meta SET value = ? WHERE key = 'source_mtime_ns'", (str(st.st_mtime_ns),))
+        return True
+
+class PeopleIndex(SourceIndex):
+    index_path = staticmethod(index_path)
+    build = staticmethod(build)
+    format = FORMAT
+
+    def _one(self, sql, key):
+        row = self.db.execute(sql, (key,)).fetchone()
+        return row[0] if row else None
+
+    # Single lookups (indexed); on duplicates the last People row wins
+
+    def login_for_name(self, full_name):
+        return self._one("SELECT login FROM people WHERE full_name = ? AND login <> '' ORDER BY rowid DESC LIMIT 1", full_name)
+
+    def login_for_id(self, user_id):
+        return self._one("SELECT login FROM people WHERE user_id = ? AND login <> '' ORDER BY rowid DESC LIMIT 1", str(user_id))
+
+    def name_for_login(self, login):
+        return self._one("SELECT full_name FROM people WHERE login = ? AND full_name <> '' ORDER BY rowid DESC LIMIT 1", login)
+
+    def name_for_id(self, user_id):
+        return self._one("SELECT full_name FROM people WHERE user_id = ? AND full_name <> '' ORDER BY rowid DESC LIMIT 1", str(user_id))
+
+    def user_ref(self, content_id):
+        return self._one("SELECT login FROM user_refs WHERE id = ?", str(content_id))
+
+    def catalog_ref(self, content_id):
+        return self._one("SELECT name FROM catalog_refs WHERE id = ?", str(content_id))
+
+    # Whole maps, for converters that look up every row
+
+    def name_to_login(self):
+        return dict(self.db.execute("SELECT full_name, login FROM people WHERE full_name <> '' AND login <> '' ORDER BY rowid"))
+
+    def id_to_login(self):
+        return dict(self.db.execute("SELECT user_id, login FROM people WHERE user_id <> '' AND login <> '' ORDER BY rowid"))
+
+    def user_map(self):
+        return dict(self.db.execute("SELECT id, login FROM user_refs"))
+
+    def catalog_map(self):
+        return dict(self.db.execute("SELECT id, name FROM catalog_refs"))
+
+    def rejects(self):
+        # (class, name, cur_status, data_json, reason, detail) of the People
+        # records left out, in export order
+        return self.db.execute("SELECT * FROM rejects ORDER BY rowid").fetchall()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or check the People identity index of a CMDB export.")
+    parser.add_argument('--source', default=SOURCE_FILE)
+    parser.add_argument('--rebuild', action='store_true')
+    args = parser.parse_args(argv)
+
+    index = PeopleIndex.open(args.source, rebuild=args.rebuild)
+    count = lambda table: index.db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    print(f"{index.path}: {count('people')} people, {count('user_refs')} user refs, {count('catalog_refs')} catalog refs,"
+          f" {count('rejects')} rejected")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+"""Reader -> workers -> writer pipeline over bounded queues.
+
+    for result in Pipeline(tasks, work, workers=4).results():
+        write(result)
+
+A reader thread pulls tasks from the tasks iterable (the disk reads) into a
+bounded input queue. Worker threads take them from there, run work(task) and
+put the results on a bounded output queue; with a process pool given, each
+worker thread hands its task to the pool, so decoding runs in parallel
+outside the GIL. The calling thread is the writer: results() yields the
+results in task order, holding back the ones that finish early. A full
+queue blocks the stage that feeds it, so no stage runs more than queue_size
+tasks ahead of the one after it and memory stays bounded.
+
+Every stage keeps its metrics: tasks done, time busy, time starved (waiting
+for input) and time blocked (waiting for room downstream), and the depth of
+its input queue at every take. report() prints them with the stage that
+limits the run: the one that is busy for the largest share of the time.
+
+Usage: see migrate_export.py --jobs (and --metrics)
+"""
+import queue
+import threading
+import time
+
+QUEUE_SIZE = 8
+
+_DONE = object()
+
+class StageMetrics:
+    def __init__(self, name, threads=1):
+        self.name = name
+        self.threads = threads
+        self.items = 0
+        self.busy = 0.0
+        self.starved = 0.0
+        self.blocked = 0.0
+        self.depth_sum = 0
+        self.depth_max = 0
+        self.takes = 0
+        self.lock = threading.Lock()
+
+    def add(self, busy=0.0, starved=0.0, blocked=0.0, items=0, depth=None):
+        with self.lock:
+            self.busy += busy
+            self.starved += starved
+            self.blocked += blocked
+            self.items += items
+            if depth is not None:
+                self.depth_sum += depth
+                self.depth_max = max(self.depth_max, depth)
+                self.takes += 1
+
+    def utilization(self, elapsed):
+        # Share of the run its threads were busy
+        return self.busy / (elapsed * self.threads) if elapsed > 0 else 0.0
+
+    def as_dict(self, elapsed):
+        return {'stage': self.name, 'threads': self.threads, 'items': self.items,
+                'busy_s': round(self.busy, 3), 'starved_s': round(self.starved, 3),
+                'blocked_s': round(self.blocked, 3),
+                'items_per_s': round(self.items / self.busy, 1) if self.busy else None,
+                'utilization': round(self.utilization(elapsed), 3),
+                'queue_avg': round(self.depth_sum / self.takes, 2) if self.takes else None,
+                'queue_max': self.depth_max}
+
+class Pipeline:
+    def __init__(self, tasks, work, workers=1, pool=None, queue_size=QUEUE_SIZE, size=None):
+        # size(task) -> bytes, counted as the reader's throughput when given
+        self.tasks = tasks
+        self.work = work
+        self.workers = max(1, workers)
+        self.pool = pool
+        self.size = size
+        self.inbox = queue.Queue(queue_size)
+        self.outbox = queue.Queue(queue_size)
+        self.stop = threading.Event()
+        self.reader = StageMetrics('reader')
+        self.worker = StageMetrics('work', self.workers)
+        self.writer = StageMetrics('writer')
+        self.bytes_read = 0
+        self.elapsed = 0.0
+
+    def _put(self, q, item):
+        # Blocks while q is full; gives up once the pipeline is stopped
+        while not self.stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q):
+        # The next item of q, or _DONE once the pipeline is stopped
+        while not self.stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _read(self):
+        seq = 0
+        try:
+            tasks = iter(self.tasks)
+            while True:
+                t0 = time.perf_counter()
+                task = next(tasks, _DONE)
+                t1 = time.perf_counter()
+                if task is _DONE: break
+                if self.size: self.bytes_read += self.size(task)
+                ok = self._put(self.inbox, (seq, task))
+                self.reader.add(busy=t1 - t0, blocked=time.perf_counter() - t1, items=1)
+                if not ok: return
+                seq += 1
+        except BaseException as e:
+            self._put(self.outbox, (-1, e))
+        for _ in range(self.workers):
+            self._put(self.inbox, _DONE)
+
+    def _work(self):
+        run = self.work if self.pool is None else (lambda task: self.pool.apply(self.work, (task,)))
+        while True:
+            t0 = time.perf_counter()
+            depth = self.inbox.qsize()
+            item = self._get(self.inbox)
+            t1 = time.perf_counter()
+            if item is _DONE:
+                self.worker.add(starved=t1 - t0)
+                self._put(self.outbox, _DONE)
+                return
+            seq, task = item
+            try:
+                result = run(task)
+            except BaseException as e:
+                result, seq = e, -1
+            t2 = time.perf_counter()
+            self._put(self.outbox, (seq, result))
+            self.worker.add(busy=t2 - t1, starved=t1 - t0, blocked=time.perf_counter() - t2, items=1, depth=depth)
+
+    def results(self):
+        # The results in task order; a failed task or read raises here
+        start = time.perf_counter()
+        threads = [threading.Thread(target=self._read, daemon=True)]
+        threads += [threading.Thread(target=self._work, daemon=True) for _ in range(self.workers)]
+        for t in threads: t.start()
+        pending, next_seq, running = {}, 0, self.workers
+        try:
+            while running:
+                t0 = time.perf_counter()
+                depth = self.outbox.qsize()
+                item = self.outbox.get()
+                self.writer.add(starved=time.perf_counter() - t0, depth=depth)
+                if item is _DONE:
+                    running -= 1
+                    continue
+                seq, result = item
+                if seq < 0: raise result
+                pending[seq] = result
+                while next_seq in pending:
+                    t1 = time.perf_counter()
+                    yield pending.pop(next_seq)
+                    next_seq += 1
+                    self.writer.add(busy=time.perf_counter() - t1, items=1)
+        finally:
+            self.stop.set()
+            self.elapsed = time.perf_counter() - start
+
+    def metrics(self):
+        stages = [s.as_dict(self.elapsed) for s in (self.reader, self.worker, self.writer)]
+        if self.reader.busy:
+            stages[0]['mb_per_s'] = round(self.bytes_read / self.reader.busy / (1 << 20), 1)
+        return {'elapsed_s': round(self.elapsed, 3), 'bytes_read': self.bytes_read, 'stages': stages,
+                'bottleneck': max((self.reader, self.worker, self.writer),
+                                  key=lambda s: s.utilization(self.elapsed)).name}
+
+    def report(self):
+        m = self.metrics()
+        lines = [f"Pipeline: {m['elapsed_s']:.2f}s, {m['bytes_read'] / (1 << 20):.1f} MB read,"
+                 f" limited by {m['bottleneck']}"]
+        for s in m['stages']:
+            queue_info = f", input queue avg {s['queue_avg']} max {s['queue_max']}" if s['queue_avg'] is not None else ''
+            lines.append(f"  {s['stage']} x{s['threads']}: {s['items']} tasks, busy {s['busy_s']:.2f}s"
+                         f" ({s['utilization']:.0%}), starved {s['starved_s']:.2f}s,"
+                         f" blocked {s['blocked_s']:.2f}s{queue_info}")
+        return lines
@@ -1,31 +1,21 @@
 import csv
-import json
 
-source_file = '/Users/sabyrzhanzhakipov/znuny-mount/old_otrs_cmdb_export_v2.csv'
-output_file = '/Users/sabyrzhanzhakipov/znuny-mount/tools_for_znuny.csv'
+from cmdb_export import BASE_DIR, SOURCE_FILE
+from compressed import open_file, output_path
+from mojibake import fix_mojibake
+from owner_resolver import OwnerResolver
+from quarantine import Quarantine, decode_version
 
-# Map full names to logins from People class
-name_to_login = {}
-with open(source_file, 'r', encoding='utf-8') as f:
-    reader = csv.reader(f)
-    next(reader)
-    for row in reader:
-        if row[0] == 'People':
-            try:
-                data = json.loads(row[3])
-                v = data[1]['Version'][1]
-                login = v.get('FIO', [None, {}])[1].get('ResolvedUser', '')
-                full_name = v.get('FIO', [None, {}])[1].get('ResolvedUserFull', '')
-                if login and full_name: name_to_login[full_name] = login
-            except: pass
+source_file = SOURCE_FILE
+output_file = output_path(f'{BASE_DIR}/tools_for_znuny.csv')
+rejects_output = output_path(f'{BASE_DIR}/tools_for_znuny_rejects.csv')
 
-def fix_mojibake(s):
-    if not s: return ""
-    try: return s.encode('latin1').decode('utf-8')
-    except: return s
+# Full names to logins from People and the user exports (see owner_resolver.py)
+resolver = OwnerResolver().load_sources(source_file=source_file)
 
-with open(source_file, 'r', encoding='utf-8') as f, \
-     open(output_file, 'w', encoding='utf-8', newline='') as f_out:
+with open_file(source_file) as f, \
+     open_file(output_file, 'w', newline='') as f_out, \
+     Quarantine(rejects_output) as quarantine:
     
     reader = csv.reader(f)
     next(reader)
@@ -36,22 +26,23 @@ with open(source_file, 'r', encoding='utf-8') as f, \
         if cls != 'Tools': continue
             
         try:
-            data = json.loads(json_data)
-            v = data[1]['Version'][1]
+            v = decode_version(json_data)
             t_type = fix_mojibake(v.get('ToolsType', [None, {}])[1].get('ResolvedName', ''))
             serial = v.get('SerialNumber', [None, {}])[1].get('Content', '')
             notes = fix_mojibake(v.get('Notes', [None, {}])[1].get('Content', '')).replace('\n', ' ').replace('\r', '')
             
             # Resolve Owner
             owner_name = fix_mojibake(v.get('Vladelec', [None, {}])[1].get('ResolvedUserFull', ''))
-            owner_login = name_to_login.get(owner_name, "")
+            owner_login = resolver.resolve(owner_name) or ""
             
             # Use states from DB: Production (Depl) and Ok (Inci)
             item_name = fix_mojibake(name_orig)
             if not item_name or item_name.strip() == "":
                 item_name = f"{t_type} ({serial})" if serial else t_type
             
-            if not item_name: continue
+            if not item_name:
+                quarantine.add(cls, name_orig, status, json_data, 'empty_name')
+                continue
             
             # FINAL ORDER (no first empty column): 
             # 1: Name, 2: DeplState, 3: InciState, 4: Type, 5: Serial, 6: Owner, 7: Notes
@@ -65,6 +56,8 @@ with open(source_file, 'r', encoding='utf-8') as f, \
                 notes
             ])
                 
-        except: continue
+        except Exception as e:
+            quarantine.add_error(cls, name_orig, status, json_data, e)
 
 print("Corrected CSV for Znuny generated with verified states.")
+print(f"Rejected: {quarantine.summary()} -> {rejects_output}")
@@ -1,34 +1,24 @@
 import csv
-import json
+import re
 
-source_file = '/Users/sabyrzhanzhakipov/znuny-mount/old_otrs_cmdb_export_v2.csv'
-output_file = '/Users/sabyrzhanzhakipov/znuny-mount/tools_final_for_import.csv'
+from cmdb_export import BASE_DIR, SOURCE_FILE
+from compressed import open_file, output_path
+from mojibake import fix_mojibake
+from owner_resolver import OwnerResolver
+from quarantine import Quarantine, decode_version
 
-# Create Name to Login map for People
-# In the export, People items have a "Name" field (row[1]) like "Урусов Денис" 
-# and inside JSON there is a ResolvedUser (Login).
-name_to_login = {}
-with open(source_file, 'r', encoding='utf-8') as f:
-    reader = csv.reader(f)
-    next(reader)
-    for row in reader:
-        if row[0] == 'People':
-            try:
-                data = json.loads(row[3])
-                v = data[1]['Version'][1]
-                login = v.get('FIO', [None, {}])[1].get('ResolvedUser', '')
-                full_name = v.get('FIO', [None, {}])[1].get('ResolvedUserFull', '')
-                if login and full_name:
-                    name_to_login[full_name] = login
-            except: pass
+_PARENS = re.compile(r'\((.*?)\)')
+
+source_file = SOURCE_FILE
+output_file = output_path(f'{BASE_DIR}/tools_final_for_import.csv')
+rejects_output = output_path(f'{BASE_DIR}/tools_final_for_import_rejects.csv')
 
-def fix_mojibake(s):
-    if not s: return ""
-    try: return s.encode('latin1').decode('utf-8')
-    except: return s
+# Full names to logins from People and the user exports (see owner_resolver.py)
+resolver = OwnerResolver().load_sources(source_file=source_file)
 
-with open(source_file, 'r', encoding='utf-8') as f, \
-     open(output_file, 'w', encoding='utf-8', newline='') as f_out:
+with open_file(source_file) as f, \
+     open_file(output_file, 'w', newline='') as f_out, \
+     Quarantine(rejects_output) as quarantine:
     
     reader = csv.reader(f)
     next(reader)
@@ -39,8 +29,7 @@ with open(source_file, 'r', encoding='utf-8') as f, \
         if cls != 'Tools': continue
             
         try:
-            data = json.loads(json_data)
-            v = data[1]['Version'][1]
+            v = decode_version(json_data)
             
             # Extract fields
             t_type = fix_mojibake(v.get('ToolsType', [None, {}])[1].get('ResolvedName', ''))
@@ -51,16 +40,13 @@ with open(source_file, 'r', encoding='utf-8') as f, \
             # Try to resolve owner
             # Often OTRS "ResolvedUserFull" in the XML of the Tool's Vladelec field contains the name
             owner_name = fix_mojibake(v.get('Vladelec', [None, {}])[1].get('ResolvedUserFull', ''))
-            owner_login = name_to_login.get(owner_name, "")
+            owner_login = resolver.resolve(owner_name) or ""
             
             # If still no login, look at the Tool's own name, it often has the owner in parens
             if not owner_login:
-                name_fixed = fix_mojibake(name_orig)
-                import re
-                m = re.search(r'\((.*?)\)', name_fixed)
+                m = _PARENS.search(fix_mojibake(name_orig))
                 if m:
-                    pot_name = m.group(1)
-                    owner_login = name_to_login.get(pot_name, "")
+                    owner_login = resolver.resolve(m.group(1)) or ""
             
             item_name = fix_mojibake(name_orig)
             if not item_name or item_name.strip() == "":
@@ -80,6 +66,8 @@ with open(source_file, 'r', encoding='utf-8') as f, \
                 notes
             ])
                 
-        except: continue
+        except Exception as e:
+            quarantine.add_error(cls, name_orig, status, json_data, e)
 
 print("Final CSV for Tools generated.")
+print(f"Rejected: {quarantine.summary()} -> {rejects_output}")
@@ -1,35 +1,23 @@
 import csv
-import json
 
-source_file = '/Users/sabyrzhanzhakipov/znuny-mount/old_otrs_cmdb_export_v2.csv'
-output_file = '/Users/sabyrzhanzhakipov/znuny-mount/tools_final_mapped.csv'
+from cmdb_export import BASE_DIR, SOURCE_FILE
+from compressed import open_file, output_path
+from mojibake import fix_mojibake
+from people_index import PeopleIndex
+from quarantine import Quarantine, decode_version
 
-# Step 1: Create ID -> Login map from the People class in the export
-id_to_login = {}
-with open(source_file, 'r', encoding='utf-8') as f:
-    reader = csv.reader(f)
-    next(reader)
-    for row in reader:
-        if row[0] == 'People':
-            try:
-                data = json.loads(row[3])
-                # In OTRS export, the ConfigItemID of the person is often the key
-                # but we need to find where it's stored.
-                # Actually, we can just use the user_id_to_login we found earlier.
-                v = data[1]['Version'][1]
-                fio_cid = v.get('FIO', [None, {}])[1].get('Content', '')
-                fio_login = v.get('FIO', [None, {}])[1].get('ResolvedUser', '')
-                if fio_cid and fio_login:
-                    id_to_login[str(fio_cid)] = fio_login
-            except: pass
+source_file = SOURCE_FILE
+output_file = output_path(f'{BASE_DIR}/tools_final_mapped.csv')
+rejects_output = output_path(f'{BASE_DIR}/tools_final_mapped_rejects.csv')
 
-def fix_mojibake(s):
-    if not s: return ""
-    try: return s.encode('latin1').decode('utf-8')
-    except: return s
+# Step 1: ID -> Login map from the People class (persistent index, see people_index.py)
+index = PeopleIndex.open(source_file)
+id_to_login = index.id_to_login()
+index.close()
 
-with open(source_file, 'r', encoding='utf-8') as f, \
-     open(output_file, 'w', encoding='utf-8', newline='') as f_out:
+with open_file(source_file) as f, \
+     open_file(output_file, 'w', newline='') as f_out, \
+     Quarantine(rejects_output) as quarantine:
     
     reader = csv.reader(f)
     next(reader)
@@ -42,8 +30,7 @@ with open(source_file, 'r', encoding='utf-8') as f, \
         if cls != 'Tools': continue
             
         try:
-            data = json.loads(json_data)
-            v = data[1]['Version'][1]
+            v = decode_version(json_data)
             
             item_name = fix_mojibake(name)
             item_depl = 'In Use' 
@@ -62,10 +49,14 @@ with open(source_file, 'r', encoding='utf-8') as f, \
             if not item_name or item_name.strip() == "":
                 item_name = f"{t_type} ({serial})" if serial else t_type
             
-            if not item_name: continue
+            if not item_name:
+                quarantine.add(cls, name, status, json_data, 'empty_name')
+                continue
             
             writer.writerow([item_name, item_depl, item_inci, t_type, vendor, serial, owner_login, notes])
                 
-        except: continue
+        except Exception as e:
+            quarantine.add_error(cls, name, status, json_data, e)
 
 print("Final mapped CSV generated successfully.")
+print(f"Rejected: {quarantine.summary()} -> {rejects_output}")
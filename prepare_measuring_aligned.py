@@ -1,16 +1,17 @@
 import csv
-import json
 
-source_file = '/Users/sabyrzhanzhakipov/znuny-mount/old_otrs_cmdb_export_v2.csv'
-output_file = '/Users/sabyrzhanzhakipov/znuny-mount/measuring_tools_aligned_import.csv'
+from cmdb_export import BASE_DIR, SOURCE_FILE
+from compressed import open_file, output_path
+from mojibake import fix_mojibake
+from quarantine import Quarantine, decode_version
 
-def fix_mojibake(s):
-    if not s: return ""
-    try: return s.encode('latin1').decode('utf-8')
-    except: return s
+source_file = SOURCE_FILE
+output_file = output_path(f'{BASE_DIR}/measuring_tools_aligned_import.csv')
+rejects_output = output_path(f'{BASE_DIR}/measuring_tools_aligned_import_rejects.csv')
 
-with open(source_file, 'r', encoding='utf-8') as f, \
-     open(output_file, 'w', encoding='utf-8', newline='') as f_out:
+with open_file(source_file) as f, \
+     open_file(output_file, 'w', newline='') as f_out, \
+     Quarantine(rejects_output) as quarantine:
     
     reader = csv.reader(f)
     next(reader)
@@ -32,8 +33,7 @@ with open(source_file, 'r', encoding='utf-8') as f, \
         if cls != 'MeasuringTools': continue
             
         try:
-            data = json.loads(json_data)
-            v = data[1]['Version'][1]
+            v = decode_version(json_data)
             
             item_name = fix_mojibake(name)
             item_depl = 'In Use'
@@ -48,10 +48,14 @@ with open(source_file, 'r', encoding='utf-8') as f, \
             if not item_name or item_name.strip() == "":
                 item_name = f"{tools_type} ({serial})" if serial else tools_type
             
-            if not item_name: continue
+            if not item_name:
+                quarantine.add(cls, name, status, json_data, 'empty_name')
+                continue
             
             writer.writerow([item_name, item_depl, item_inci, tools_type, serial, owner_login, notes, obj])
                 
-        except: continue
+        except Exception as e:
+            quarantine.add_error(cls, name, status, json_data, e)
 
 print("MeasuringTools aligned CSV generated.")
+print(f"Rejected: {quarantine.summary()} -> {rejects_output}")
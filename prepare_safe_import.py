@@ -1,18 +1,17 @@
 import csv
-import json
 
-source_file = '/Users/sabyrzhanzhakipov/znuny-mount/old_otrs_cmdb_export_v2.csv'
-tools_output = '/Users/sabyrzhanzhakipov/znuny-mount/tools_safe_import.csv'
+from cmdb_export import BASE_DIR, SOURCE_FILE
+from compressed import open_file, output_path
+from mojibake import fix_mojibake
+from quarantine import Quarantine, decode_version
 
-def fix_mojibake(s):
-    if not s: return ""
-    try:
-        return s.encode('latin1').decode('utf-8')
-    except:
-        return s
+source_file = SOURCE_FILE
+tools_output = output_path(f'{BASE_DIR}/tools_safe_import.csv')
+rejects_output = output_path(f'{BASE_DIR}/tools_safe_import_rejects.csv')
 
-with open(source_file, 'r', encoding='utf-8') as f, \
-     open(tools_output, 'w', encoding='utf-8', newline='') as f_out:
+with open_file(source_file) as f, \
+     open_file(tools_output, 'w', newline='') as f_out, \
+     Quarantine(rejects_output) as quarantine:
     
     reader = csv.reader(f)
     next(reader)
@@ -27,8 +26,7 @@ with open(source_file, 'r', encoding='utf-8') as f, \
         if cls != 'Tools': continue
             
         try:
-            data = json.loads(json_data)
-            v = data[1]['Version'][1]
+            v = decode_version(json_data)
             
             item_name = fix_mojibake(name)
             
@@ -47,11 +45,14 @@ with open(source_file, 'r', encoding='utf-8') as f, \
                 item_name = f"{tools_type} ({serial})" if serial else tools_type
             
             # Important: if name is still empty, skip
-            if not item_name: continue
+            if not item_name:
+                quarantine.add(cls, name, status, json_data, 'empty_name')
+                continue
             
             writer.writerow([item_name, item_depl, item_inci, tools_type, serial, obj, notes])
                 
-        except:
-            continue
+        except Exception as e:
+            quarantine.add_error(cls, name, status, json_data, e)
 
 print("Safe import CSV generated.")
+print(f"Rejected: {quarantine.summary()} -> {rejects_output}")
@@ -1,25 +1,20 @@
 import csv
-import json
 import re
 
-def fix_mojibake(s):
-    if not s:
-        return ""
-    try:
-        # If it's double-encoded UTF-8:
-        # 1. Encode to bytes as latin1 (mapping code points 0-255 to bytes 0-255)
-        # 2. Decode as utf-8
-        return s.encode('latin1').decode('utf-8')
-    except:
-        return s
+from cmdb_export import BASE_DIR, SOURCE_FILE
+from compressed import open_file, output_path
+from mojibake import fix_mojibake
+from quarantine import Quarantine, decode_version
 
-source_file = '/Users/sabyrzhanzhakipov/znuny-mount/old_otrs_cmdb_export_v2.csv'
-tools_output = '/Users/sabyrzhanzhakipov/znuny-mount/tools_ready.csv'
-mtools_output = '/Users/sabyrzhanzhakipov/znuny-mount/measuring_tools_ready.csv'
+source_file = SOURCE_FILE
+tools_output = output_path(f'{BASE_DIR}/tools_ready.csv')
+mtools_output = output_path(f'{BASE_DIR}/measuring_tools_ready.csv')
+rejects_output = output_path(f'{BASE_DIR}/tools_ready_rejects.csv')
 
-with open(source_file, 'r', encoding='utf-8') as f, \
-     open(tools_output, 'w', encoding='utf-8', newline='') as f_tools, \
-     open(mtools_output, 'w', encoding='utf-8', newline='') as f_mtools:
+with open_file(source_file) as f, \
+     open_file(tools_output, 'w', newline='') as f_tools, \
+     open_file(mtools_output, 'w', newline='') as f_mtools, \
+     Quarantine(rejects_output) as quarantine:
     
     reader = csv.reader(f)
     header = next(reader)
@@ -39,9 +34,7 @@ with open(source_file, 'r', encoding='utf-8') as f, \
             continue
             
         try:
-            data = json.loads(json_data)
-            # OTRS structure: [None, {"Version": [None, {...}]}]
-            v = data[1]['Version'][1]
+            v = decode_version(json_data)
             
             item_name = fix_mojibake(name)
             item_status = status.split('::')[-1]
@@ -62,6 +55,7 @@ with open(source_file, 'r', encoding='utf-8') as f, \
                 writer_mtools.writerow([item_name, item_status, 'Ok', tools_type, serial, owner_id, obj, notes])
                 
         except Exception as e:
-            print(f"Error processing row: {e}")
+            quarantine.add_error(cls, name, status, json_data, e)
 
 print("Migration files prepared successfully with Python.")
+print(f"Rejected: {quarantine.summary()} -> {rejects_output}")
@@ -0,0 +1,136 @@
+"""Reject quarantine: the export records a conversion could not use.
+
+Instead of being dropped silently, every rejected record is written to a
+quarantine CSV with the export's own columns, as read (class, name,
+cur_status, data_json), and why:
+
+  reason   bad_json          data_json does not decode
+           no_version        data_json has no [null, {"Version": [null, {...}]}]
+           empty_name        no name, not even the fallback
+           unresolved_owner  no owner candidate resolves (migrate_export.py
+                             --strict-owners; otherwise the owner is "sz")
+           error             anything else the conversion raised
+  detail   the error message, or the names that did not resolve
+
+The file reads like an export, iter_export() ignores the extra columns, so
+after a fix only the rejected records need converting again
+(migrate_export.py --retry). It is written to a side file that replaces
+the previous quarantine when closed; a run that fails leaves the previous one
+as it was. It may be compressed (compressed.py).
+
+Usage: python3 quarantine.py FILE    (counts per class and reason)
+"""
+import argparse
+import csv
+import json
+import os
+from collections import Counter
+
+from compressed import open_file
+
+REASONS = ('bad_json', 'no_version', 'empty_name', 'unresolved_owner', 'error')
+HEADER = ['class', 'name', 'cur_status', 'data_json', 'reason', 'detail']
+
+class Reject(Exception):
+    def __init__(self, reason, detail=''):
+        super().__init__(f"{reason}: {detail}" if detail else reason)
+        self.reason = reason
+        self.detail = detail
+
+def decode_version(raw):
+    # The Version attributes of a data_json string; raises Reject
+    try:
+        data = json.loads(raw)
+    except ValueError as e:
+        raise Reject('bad_json', str(e)) from None
+    return version_of(data)
+
+def version_of(data):
+    # The Version attributes of decoded data_json; raises Reject
+    try:
+        version = data[1]['Version'][1]
+    except (KeyError, IndexError, TypeError) as e:
+        raise Reject('no_version', f"{type(e).__name__}: {e}") from None
+    if not isinstance(version, dict):
+        raise Reject('no_version', f"Version is {type(version).__name__}")
+    return version
+
+def reason_of(error):
+    # (reason, detail) of an exception raised while converting a record
+    if isinstance(error, Reject):
+        return error.reason, error.detail
+    return 'error', f"{type(error).__name__}: {error}"
+
+class Quarantine:
+    def __init__(self, path):
+        self.path = path
+        self.tmp = os.path.join(os.path.dirname(path), f'.tmp-{os.path.basename(path)}')
+        self.f = open_file(self.tmp, 'w', newline='')
+        self.writer = csv.writer(self.f)
+        self.writer.writerow(HEADER)
+        self.counts = Counter()
+
+    def add(self, cls, name, status, raw, reason, detail=''):
+        self.writer.writerow([cls, name, status, raw, reason, detail])
+        self.counts[reason] += 1
+
+    def add_error(self, cls, name, status, raw, error):
+        self.add(cls, name, status, raw, *reason_of(error))
+
+    def carry_over(self, path, classes):
+        # Keeps the records of an earlier quarantine whose class is not in
+        # classes (a retry of some classes leaves the others quarantined)
+        with open_file(path, 'r', newline='') as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            for row in reader:
+                if len(row) >= 4 and row[0] not in classes:
+                    reason = row[4] if len(row) > 4 else 'error'
+                    detail = row[5] if len(row) > 5 else ''
+                    self.add(row[0], row[1], row[2], row[3], reason, detail)
+
+    def close(self):
+        if self.f.closed: return
+        self.f.close()
+        os.replace(self.tmp, self.path)
+
+    def discard(self):
+        # Drops what was written and keeps the previous quarantine, which a
+        # failed --retry still needs
+        if self.f.closed: return
+        self.f.close()
+        os.remove(self.tmp)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+    def total(self):
+        return sum(self.counts.values())
+
+    def summary(self):
+        parts = ', '.join(f"{r} {self.counts[r]}" for r in REASONS if self.counts[r])
+        return f"{self.total()} rejected" + (f" ({parts})" if parts else "")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize a quarantine file.")
+    parser.add_argument('file')
+    args = parser.parse_args(argv)
+
+    counts = Counter()
+    with open_file(args.file, 'r', newline='') as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        for row in reader:
+            if len(row) >= 5: counts[(row[0], row[4])] += 1
+    for (cls, reason), n in sorted(counts.items()):
+        print(f"{cls};{reason};{n}")
+    print(f"{sum(counts.values())} rejected")
+
+if __name__ == '__main__':
+    main()
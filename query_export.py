@@ -0,0 +1,186 @@
+"""Aggregation queries over the CMDB export.
+
+  python3 query_export.py group-by class=Approvals key=Group.ResolvedName
+  python3 query_export.py group-by class=Approvals key=Group.ResolvedName collect=Type.ResolvedName
+  python3 query_export.py group-by class=Tools,MeasuringTools key=class collect=ToolsType.ResolvedName
+
+group-by counts the rows of the given classes per key, or with collect=
+gathers the distinct values of a second field per key. Fields are the
+export_columns.py paths; the leading 'Version.' may be left out, and
+key=class groups by the class itself. Several queries can be given in one
+call (each starting with group-by). They all run on the same columnar copy
+of the export (export_columns.py, built by one scan when missing or stale),
+and the columns they share are read once.
+
+Keys and values are shown with the mojibake fixed (values that fix to the
+same text are merged) unless --raw is given. Results are cached in
+{source}.query_cache, keyed on the SHA-256 of the export, so a repeated
+query does not read any columns.
+
+Usage: python3 query_export.py [--source CSV] [--raw] [--json] [--no-cache]
+                               group-by class=CLS[,CLS...] key=FIELD [collect=FIELD] ...
+"""
+import argparse
+import json
+import marshal
+import os
+import sys
+from collections import namedtuple
+
+from cmdb_export import SOURCE_FILE
+from export_columns import ColumnStore
+from mojibake import fix_mojibake
+
+CACHE_VERSION = 2
+ROW_FIELDS = ('name', 'cur_status')
+
+Query = namedtuple('Query', 'classes key collect')
+
+def field_path(field):
+    # 'Group.ResolvedName' -> 'Version.Group.ResolvedName'
+    if field in ROW_FIELDS or field == 'class' or field.startswith('Version.'):
+        return field
+    return f'Version.{field}'
+
+def parse_queries(tokens):
+    # ['group-by', 'class=A', 'key=F', ...] -> [Query, ...]
+    queries, current = [], None
+    for token in tokens:
+        if token == 'group-by':
+            current = {}
+            queries.append(current)
+            continue
+        if current is None or '=' not in token:
+            raise ValueError(f"unexpected {token!r}; queries start with group-by")
+        name, value = token.split('=', 1)
+        if name not in ('class', 'key', 'collect'):
+            raise ValueError(f"unknown group-by argument {name!r}")
+        current[name] = value
+    result = []
+    for q in queries:
+        if 'class' not in q or 'key' not in q:
+            raise ValueError("group-by needs class= and key=")
+        result.append(Query(tuple(q['class'].split(',')), field_path(q['key']),
+                            field_path(q['collect']) if q.get('collect') else None))
+    return result
+
+def cache_path(source_file):
+    return f'{source_file}.query_cache'
+
+class ResultCache:
+    # {query: result} for one export hash, stored with marshal
+    def __init__(self, path, source_hash):
+        self.path = path
+        self.key = [CACHE_VERSION, source_hash]
+        self.results = {}
+        self.dirty = False
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'rb') as f:
+                    cached = marshal.load(f)
+                if cached.get('key') == self.key:
+                    self.results = cached['results']
+            except (OSError, EOFError, ValueError, TypeError, AttributeError):
+                pass
+
+    def get(self, name):
+        return self.results.get(name)
+
+    def put(self, name, result):
+        self.results[name] = result
+        self.dirty = True
+
+    def save(self):
+        if not (self.path and self.dirty): return
+        tmp = f'{self.path}.tmp'
+        try:
+            with open(tmp, 'wb') as f:
+                marshal.dump({'key': self.key, 'results': self.results}, f)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+def _fix(value):
+    return fix_mojibake(value) if isinstance(value, str) else value
+
+def group_by(store, query, fix=True):
+    # {key: count} or {key: sorted distinct values}, keys in order of first
+    # appearance in the export
+    result = {}
+    for cls in query.classes:
+        if query.key == 'class':
+            if query.collect is None:
+                groups = {cls: store.rows(cls)} if store.rows(cls) else {}
+            else:
+                values = store.encoded(cls, query.collect)[0]
+                groups = {cls: set(v if v is not None else '' for v in values[1:])} if store.rows(cls) else {}
+        else:
+            groups = store.group(cls, query.key, of=query.collect)
+        for key, value in groups.items():
+            if fix: key = _fix(key)
+            if query.collect is None:
+                result[key] = result.get(key, 0) + value
+            else:
+                result.setdefault(key, set()).update(map(_fix, value) if fix else value)
+    if query.collect is not None:
+        result = {key: sorted(values, key=str) for key, values in result.items()}
+    return result
+
+def run_queries(queries, source_file=SOURCE_FILE, fix=True, use_cache=True):
+    # The results of queries, in order; the store is opened (and built when
+    # needed) once and only the columns of uncached queries are read
+    store = ColumnStore.open(source_file)
+    cache = ResultCache(cache_path(source_file) if use_cache else None, store.meta.get('source_sha256'))
+    results = []
+    for query in queries:
+        name = repr((tuple(query), fix))
+        result = cache.get(name)
+        if result is None:
+            result = group_by(store, query, fix)
+            cache.put(name, result)
+        results.append(result)
+    cache.save()
+    return results
+
+def format_result(query, result):
+    lines = []
+    if query.collect is None:
+        for key, count in result.items():
+            lines.append(f"{key}: {count}")
+    else:
+        for key, values in result.items():
+            lines.append(f"\n--- {key} ---")
+            lines.extend(str(v) for v in values)
+    return lines
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Group-by queries over the CMDB export.",
+                                     usage="%(prog)s [options] group-by class=CLS key=FIELD [collect=FIELD] ...")
+    parser.add_argument('--source', default=SOURCE_FILE)
+    parser.add_argument('--raw', action='store_true', help="do not fix mojibake in keys and values")
+    parser.add_argument('--json', action='store_true', help="print the results as JSON")
+    parser.add_argument('--no-cache', action='store_true', help="neither read nor write the result cache")
+    args, rest = parser.parse_known_args(argv)
+    try:
+        queries = parse_queries(rest)
+    except ValueError as e:
+        parser.error(str(e))
+    if not queries:
+        parser.error("no query given")
+
+    results = run_queries(queries, args.source, fix=not args.raw, use_cache=not args.no_cache)
+    if args.json:
+        json.dump([{'query': q._asdict(), 'result': r} for q, r in zip(queries, results)],
+                  sys.stdout, ensure_ascii=False, indent=2, default=str)
+        print()
+        return
+    for i, (query, result) in enumerate(zip(queries, results)):
+        if len(queries) > 1:
+            if i: print()
+            print(f"# group-by class={','.join(query.classes)} key={query.key}"
+                  + (f" collect={query.collect}" if query.collect else ""))
+        for line in format_result(query, result):
+            print(line)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""Streaming extractor for Content -> ResolvedUser / ResolvedName references.
+
+Replaces the recursive extract_mappings (fix_tools_import.py) / find_all
+(debug_ids.py) walks. The references are collected from the JSON decoder's
+object_hook, i.e. as each object of data_json is completed by the C scanner,
+so there is no second walk over a Python tree. The hook returns None, so no
+tree is kept either: every object is dropped as soon as it has been looked at.
+
+The hook sees objects innermost first while the old walks went outermost
+first. That only matters when an object carrying a reference contains nested
+objects, which the OTRS attribute objects never do; such rows are detected
+and re-walked in the old order with an explicit stack.
+
+Mappings are last-wins in document order, as with the old walks.
+
+Usage: python3 ref_extractor.py [--source CSV]
+"""
+import argparse
+import json
+import time
+
+from cmdb_export import SOURCE_FILE, iter_rows
+
+def walk(obj, user_map, catalog_map):
+    # Pre-order walk with an explicit stack, same visiting order as the recursion
+    stack = [obj]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if 'Content' in node:
+                if 'ResolvedUser' in node:
+                    user_map[str(node['Content'])] = node['ResolvedUser']
+                if 'ResolvedName' in node:
+                    catalog_map[str(node['Content'])] = node['ResolvedName']
+            stack.extend(reversed(node.values()))
+        elif isinstance(node, list):
+            stack.extend(reversed(node))
+
+class RefExtractor:
+    def __init__(self, user_map=None, catalog_map=None):
+        self.user_map = {} if user_map is None else user_map
+        self.catalog_map = {} if catalog_map is None else catalog_map
+        self._users = []
+        self._names = []
+        self._nested = False
+        self._decoder = json.JSONDecoder(object_hook=self._on_object)
+
+    def _on_object(self, obj):
+        if 'Content' in obj:
+            if 'ResolvedUser' in obj:
+                self._users.append((str(obj['Content']), obj['ResolvedUser']))
+            if 'ResolvedName' in obj:
+                self._names.append((str(obj['Content']), obj['ResolvedName']))
+            # Nested objects show up here as None (dropped by this hook)
+            if any(v is None or type(v) is list for v in obj.values()):
+                self._nested = True
+        return None
+
+    def feed(self, raw):
+        # Harvests one data_json string and returns the number of references
+        # found. Raises ValueError on undecodable JSON, leaving the maps as
+        # they were.
+        self._users.clear()
+        self._names.clear()
+        self._nested = False
+        self._decoder.decode(raw)
+        if self._nested:
+            walk(json.loads(raw), self.user_map, self.catalog_map)
+        else:
+            self.user_map.update(self._users)
+            self.catalog_map.update(self._names)
+        return len(self._users) + len(self._names)
+
+def scan(source_file=SOURCE_FILE):
+    # One pass over the export. Returns (user_map, catalog_map, stats) where
+    # stats is {class: {'rows', 'refs', 'errors', 'seconds'}}.
+    extractor = RefExtractor()
+    stats = {}
+    clock = time.perf_counter
+    for cls, name, status, raw in iter_rows(source_file):
+        st = stats.get(cls)
+        if st is None:
+            st = stats[cls] = {'rows': 0, 'refs': 0, 'errors': 0, 'seconds': 0.0}
+        t0 = clock()
+        try: st['refs'] += extractor.feed(raw)
+        except ValueError: st['errors'] += 1
+        st['seconds'] += clock() - t0
+        st['rows'] += 1
+    return extractor.user_map, extractor.catalog_map, stats
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Harvest Content -> ResolvedUser/ResolvedName references from a CMDB export.")
+    parser.add_argument('--source', default=SOURCE_FILE)
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    user_map, catalog_map, stats = scan(args.source)
+    print(f"Mapped {len(user_map)} users and {len(catalog_map)} catalog items in {time.perf_counter() - t0:.2f} s.")
+    for cls, st in sorted(stats.items()):
+        print(f"{cls}: {st['rows']} rows, {st['refs']} refs, {st['errors']} errors, {st['seconds'] * 1000:.1f} ms")
+
+if __name__ == '__main__':
+    main()
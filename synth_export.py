@@ -0,0 +1,228 @@
+"""Synthetic CMDB exports shaped like old_otrs_cmdb_export_v2.csv.
+
+Same header, classes and class mix as the real export, the nested
+[null, {...}] Version structure with TagKeys, mojibake'd Cyrillic (UTF-8 read
+back as latin1) in ResolvedName/ResolvedUserFull/text Content, and multi-line
+notes. Vladelec/Owner/Reciever refer to People records by CI ID; part of them
+also carry ResolvedUserFull so owner resolution gets exercised. Rows are
+written as they are generated, so any size works in constant memory, and the
+output only depends on --rows and --seed.
+
+Also writes a matching old_notifications.tsv for process_notifications.py.
+
+Usage: python3 synth_export.py --rows 100000 [--out FILE] [--seed N]
+                               [--notifications N --notifications-out FILE]
+"""
+import argparse
+import csv
+import json
+import random
+
+# Class mix of the real export (862 rows)
+CLASS_MIX = [
+    ('Approvals', 241), ('Tools', 208), ('Certificate', 183), ('PPE', 110),
+    ('People', 61), ('Passport', 44), ('Keys', 9), ('MeasuringTools', 6),
+]
+
+STATUSES = {
+    'Approvals': ['Approvals::разрешено', 'Approvals::оформление', 'Approvals::недействительно'],
+    'Passport': ['Approvals::разрешено', 'Passport::действительный'],
+}
+DEFAULT_STATUSES = ['Production', 'Maintenance', 'Retired', 'Expired', 'on_stock']
+
+FIRST_NAMES = ['Денис', 'Бауыржан', 'Виталий', 'Сергей', 'Алексей', 'Ерлан', 'Айгуль', 'Марина',
+               'Дмитрий', 'Асель', 'Нурлан', 'Ольга', 'Тимур', 'Жанна', 'Артём', 'Ёлдос']
+LAST_NAMES = ['Усов', 'Рамазанов', 'Жильцов', 'Курячий', 'Байковский', 'Иванов', 'Ахметов',
+              'Сейткали', 'Ким', 'Петренко', 'Оспанов', 'Федорова', 'Ёлкин', 'Нургалиев']
+
+APPROVAL_TYPES = ['Паспорт', 'Удостоверение личности', 'Медицинская справка', 'Допуск по электробезопасности',
+                  'Допуск к работе на высоте', 'Пропуск на объект']
+TOOL_TYPES = ['Перфоратор', 'Шуруповёрт', 'Мультиметр', 'Калибратор', 'Паяльная станция', 'Анализатор качества электроэнергии']
+PPE_TYPES = ['Перчатки', 'Каска', 'Очки защитные', 'Спецодежда', 'Респиратор']
+KEY_TYPES = ['Tuner', 'License', 'Ключ активации']
+VENDORS = ['ABB', 'EATON', 'Schneider Electric', 'Fluke', 'Makita', 'Bosch', 'ТОО «Энергоснаб»']
+CERT_TYPES = ['J7XXE-LEVEL0-Certificate', 'Сертификат инженера', 'UPS Service Level 2']
+ID_TYPES = ['Паспорт', 'Удостоверение личности']
+ORGANS = ['МВД РК', 'МЮ РК', 'ЦОН']
+OBJECTS = ['УЛЬТРА', 'Склад №2', 'ЦОД Алматы', '']
+NOTE_LINES = ['Выдано под роспись', 'Код для заказа: 4NWP101322R0001 - NewSET yearly license fee',
+              'Требуется поверка', 'Хранить на складе', 'см. акт приёма-передачи']
+
+def mojibake(s):
+    # What the old export did to UTF-8 text
+    return s.encode('utf-8').decode('latin1')
+
+def tag(*keys):
+    return '[1]' + ''.join(f"{{'{k}'}}[1]" for k in keys)
+
+class Generator:
+    def __init__(self, rows, seed=0):
+        self.rows = rows
+        self.rnd = random.Random(seed)
+        total = sum(n for _, n in CLASS_MIX)
+        self.classes = [c for c, _ in CLASS_MIX]
+        self.weights = [n / total for _, n in CLASS_MIX]
+        # People are generated up front so other classes can refer to them
+        n_people = max(1, rows * 61 // total)
+        self.people = []
+        for i in range(n_people):
+            full = f"{self.rnd.choice(FIRST_NAMES)} {self.rnd.choice(LAST_NAMES)}"
+            self.people.append({'ci_id': str(1000 + i), 'user_id': str(10 + i), 'login': f"u{i:06d}", 'full': full})
+        self._catalog = {}
+
+    def catalog_id(self, cls, name):
+        key = (cls, name)
+        if key not in self._catalog:
+            self._catalog[key] = str(100 + len(self._catalog))
+        return self._catalog[key]
+
+    # Attribute values
+
+    def catalog(self, attr, cls, name):
+        return [None, {'TagKey': tag('Version', attr), 'ResolvedClass': f'ITSM::ConfigItem::{cls}::Type',
+                       'Content': self.catalog_id(cls, name), 'ResolvedName': mojibake(name)}]
+
+    def content(self, attr, value):
+        return [None, {'Content': value, 'TagKey': tag('Version', attr)}]
+
+    def text(self, attr, value):
+        return self.content(attr, mojibake(value))
+
+    def person(self, attr, p=None, resolved=None):
+        r = self.rnd
+        if p is None:
+            if r.random() < 0.1: return self.content(attr, '')
+            p = r.choice(self.people)
+        obj = {'TagKey': tag('Version', attr), 'Content': p['ci_id']}
+        if resolved if resolved is not None else r.random() < 0.5:
+            obj.update(ResolvedUser=p['login'], ResolvedUserFull=mojibake(p['full']))
+        return [None, obj]
+
+    def date(self, attr, start=2018, years=8):
+        r = self.rnd
+        return self.content(attr, f"{r.randint(start, start + years)}-{r.randint(1, 12):02d}-{r.randint(1, 28):02d}")
+
+    def notes(self, attr):
+        r = self.rnd
+        lines = r.sample(NOTE_LINES, r.randint(0, 3))
+        return self.text(attr, ('\r\n' if r.random() < 0.2 else '\n').join(lines))
+
+    # Classes
+
+    def version(self, cls, n):
+        r = self.rnd
+        if cls == 'People':
+            p = self.people[n % len(self.people)]
+            return {
+                'FIO': [None, {'TagKey': tag('Version', 'FIO'), 'Content': p['user_id'], 'ResolvedUser': p['login'],
+                               'ResolvedUserFull': mojibake(p['full']), 'ResolvedClass': 'ITSM::SLA::Type'}],
+                'Email': self.content('Email', f"{p['login']}@example.kz"),
+                'Mobile': self.content('Mobile', f"+7(701){r.randint(1000000, 9999999)}"),
+                'District': self.content('District', ''),
+                'Position': self.content('Position', str(r.randint(2000, 3000))),
+            }
+        if cls == 'Approvals':
+            v = {'Type': self.catalog('Type', 'Approvals', r.choice(APPROVAL_TYPES)), 'EndDate': self.date('EndDate'),
+                 'Owner': self.person('Owner')}
+            if r.random() < 0.3: v['Group'] = self.person('Group', resolved=True)
+            return v
+        if cls == 'Certificate':
+            return {'Type': self.catalog('Type', 'Certificate', r.choice(CERT_TYPES)),
+                    'Vendor': self.catalog('Vendor', 'Vendor', r.choice(VENDORS)),
+                    'Reciever': self.person('Reciever'), 'IssueDate': self.date('IssueDate'), 'EndDate': self.date('EndDate')}
+        if cls == 'PPE':
+            return {'PPEType': self.catalog('PPEType', 'PPE', r.choice(PPE_TYPES)), 'Vladelec': self.person('Vladelec'),
+                    'IssueDate': self.date('IssueDate'), 'EndDate': self.date('EndDate'),
+                    'Size': self.content('Size', r.choice(['', 'M', 'L', 'XL', '52-54'])), 'Notes': self.notes('Notes')}
+        if cls == 'Passport':
+            p = r.choice(self.people)
+            return {'Vladelec': self.person('Vladelec', p), 'IDType': self.catalog('IDType', 'Passport', r.choice(ID_TYPES)),
+                    'FIOcyr': self.text('FIOcyr', p['full']), 'FIOlat': self.content('FIOlat', p['login'].upper()),
+                    'IDnum': self.content('IDnum', f"{r.randint(0, 999999999):09d}"), 'BirthDate': self.date('BirthDate', 1960, 40),
+                    'Issueorgan': self.text('Issueorgan', r.choice(ORGANS)), 'IssueDate': self.date('IssueDate'),
+                    'ExpDate': self.date('ExpDate', 2026)}
+        if cls == 'Keys':
+            return {'KeysType': self.catalog('KeysType', 'Keys', r.choice(KEY_TYPES)),
+                    'Vendor': self.catalog('Vendor', 'Vendor', r.choice(VENDORS)), 'Vladelec': self.person('Vladelec'),
+                    'KeysActivationDay': self.date('KeysActivationDay'), 'KeysValidtillDate': self.date('KeysValidtillDate'),
+                    'Note': self.notes('Note')}
+        # Tools / MeasuringTools
+        return {'ToolsType': self.catalog('ToolsType', cls, r.choice(TOOL_TYPES)),
+                'Vendor': self.catalog('Vendor', 'Vendor', r.choice(VENDORS)),
+                'SerialNumber': self.content('SerialNumber', '' if r.random() < 0.05 else f"SN{r.randint(10**9, 10**10)}"),
+                'Vladelec': self.person('Vladelec'), 'Object': self.text('Object', r.choice(OBJECTS)), 'Notes': self.notes('Notes')}
+
+    def record(self, cls, n):
+        version = self.version(cls, n)
+        # The export's key order is arbitrary; shuffle so nothing depends on it
+        items = list(version.items()) + [('TagKey', tag('Version'))]
+        self.rnd.shuffle(items)
+        data = [None, {'Version': [None, dict(items)], 'TagKey': '[1]'}]
+        status = self.rnd.choice(STATUSES.get(cls, DEFAULT_STATUSES))
+        return [cls, '', status, json.dumps(data, ensure_ascii=False, separators=(',', ':'))]
+
+    def __iter__(self):
+        # People first, then the rest in random class order
+        people = len(self.people)
+        for n in range(people):
+            yield self.record('People', n)
+        others = [c for c in self.classes if c != 'People']
+        weights = [w for c, w in zip(self.classes, self.weights) if c != 'People']
+        for n in range(self.rows - people):
+            yield self.record(self.rnd.choices(others, weights)[0], n)
+
+def write_export(path, rows, seed=0):
+    # Returns the number of records written
+    n = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_ALL)
+        writer.writerow(['class', 'name', 'cur_status', 'data_json'])
+        for row in Generator(rows, seed):
+            writer.writerow(row)
+            n += 1
+    return n
+
+NOTIFICATION_COLUMNS = ['name', 'class_id', 'valid_id', 'events', 'cron', 'filter', 'recipients', 'subject', 'body',
+                        'max_mail', 'comments', 'eventname', 'create_time', 'create_by', 'change_time', 'change_by']
+
+def write_notifications(path, rows, seed=0):
+    # mysql -B output like the real dump: LF escaped as \n, CR left raw
+    r = random.Random(seed)
+    classes = ['141', '198', '184', '281', '22', '216', '260', '284', '376', '999']
+    states = ['151', '29', '150', '152', '27', '28', '294', '188', '137', '295', '7']
+    users = ['2', '11', '21', '55', '3']
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write('\t'.join(NOTIFICATION_COLUMNS) + '\n')
+        for n in range(rows):
+            attr = r.choice(['KeysValidtillDate', 'EndDate', 'ExpDate'])
+            events = {f'Event.###{attr}.TimePoint': str(r.randint(1, 3)), f'Event.###{attr}.TimePointStart': 'Last',
+                      f'Event.###{attr}.SearchType': 'TimePoint', f'Event.###{attr}.TimePointFormat': 'month'}
+            filt = {'Filter.DeplStateIDs': r.sample(states, r.randint(1, 3))}
+            recipients = {'Recipient.Agents': r.sample(users, r.randint(1, 3))}
+            if r.random() < 0.3: recipients['Recipient.Roles'] = ['12']
+            subject = f"Истекает срок {attr} #{n}"
+            body = f"Внимание!\r\\n{subject}\r\\nСм. <OTRS_CONFIG_ItemName>"
+            when = f"2023-{r.randint(1, 12):02d}-{r.randint(1, 28):02d} 10:00:00"
+            f.write('\t'.join([
+                f"{n} {subject}", r.choice(classes), '1', json.dumps(events), '{}', json.dumps(filt), json.dumps(recipients),
+                subject, body, r.choice(['1', 'NULL']), 'NULL', 'TimePoint', when, r.choice(users), when, r.choice(users),
+            ]) + '\n')
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic CMDB export (and notifications TSV).")
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--out', default='old_otrs_cmdb_export_v2.csv')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--notifications', type=int, default=0, help="also write this many notifications")
+    parser.add_argument('--notifications-out', default='old_notifications.tsv')
+    args = parser.parse_args(argv)
+
+    n = write_export(args.out, args.rows, args.seed)
+    print(f"Wrote {n} records to {args.out}.")
+    if args.notifications:
+        write_notifications(args.notifications_out, args.notifications, args.seed)
+        print(f"Wrote {args.notifications} notifications to {args.notifications_out}.")
+
+if __name__ == '__main__':
+    main()
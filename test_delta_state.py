@@ -0,0 +1,27 @@
+"""Checks of delta_state.py. Run with python3 -m pytest."""
+from delta_state import DeltaState, row_hash
+
+def run(path, rows, cls='Keys'):
+    # One delta run over rows: (written rows, deletions, stats)
+    state = DeltaState(str(path))
+    written = [row for row in rows if state.check(cls, row[0], row)]
+    gone = state.deletions([cls])
+    state.commit([cls])
+    state.close()
+    return written, gone, state.stats[cls]
+
+def test_duplicate_names(tmp_path):
+    path = tmp_path / 'state.db'
+    rows = [['Tuner', str(n)] for n in range(9)]
+    run(path, rows)
+
+    changed = rows[:2] + [['Tuner', '2x']] + rows[3:]
+    written, gone, stats = run(path, changed)
+    assert written == [['Tuner', '2x']] and gone == []
+    assert stats == {'new': 0, 'changed': 1, 'unchanged': 8, 'deleted': 0}
+
+    removed = changed[:5] + changed[6:]
+    written, gone, stats = run(path, removed)
+    assert written == []
+    assert gone == [('Keys', 'Tuner', row_hash(['Tuner', '5']).hex(), '["Tuner", "5"]')]
+    assert stats['deleted'] == 1 and stats['unchanged'] == 8
@@ -0,0 +1,38 @@
+"""Checks of export_columns.py on a small export. Run with python3 -m pytest."""
+import os
+
+import pytest
+
+from export_columns import ColumnStore
+
+def test_list_values_are_coded_as_json(write_export):
+    source = write_export([
+        ('Tools', 'a', {'Tags': {'Content': ['x', 'y']}}),
+        ('Tools', 'b', {'Tags': {'Content': ['x', 'y']}}),
+        ('Tools', 'c', {'Tags': {'Content': {'b': 1, 'a': 2}}}),
+        ('Tools', 'd', {'Tags': {'Content': 'z'}}),
+    ])
+    store = ColumnStore.open(str(source))
+    assert store.column('Tools', 'Version.Tags.Content') == ['["x", "y"]', '["x", "y"]', '{"a": 2, "b": 1}', 'z']
+    values, codes = store.encoded('Tools', 'Version.Tags.Content')
+    assert len(values) == 4 and codes[0] == codes[1]
+
+def test_group_on_a_list_column(write_export):
+    source = write_export([
+        ('Tools', 'a', {'Tags': {'Content': ['x']}, 'Group': {'Content': 'g1'}}),
+        ('Tools', 'b', {'Tags': {'Content': ['x']}, 'Group': {'Content': 'g2'}}),
+    ])
+    store = ColumnStore.open(str(source))
+    assert store.group('Tools', 'Version.Tags.Content') == {'["x"]': 2}
+    assert store.group('Tools', 'Version.Group.Content', of='Version.Tags.Content') == {'g1': {'["x"]'}, 'g2': {'["x"]'}}
+
+def test_touched_source_is_hashed_once(write_export, monkeypatch):
+    source = write_export([('Tools', 'a', {'Group': {'Content': 'g1'}})])
+    ColumnStore.open(str(source))
+    os.utime(source, ns=(0, 10**18))
+    assert ColumnStore.open(str(source)).column('Tools', 'Version.Group.Content') == ['g1']
+
+    monkeypatch.setattr('export_columns.file_hash', lambda path: pytest.fail("hashed again"))
+    store = ColumnStore.open(str(source))
+    assert store.meta['source_mtime_ns'] == str(10**18)
+    assert store.column('Tools', 'Version.Group.Content') == ['g1']
@@ -0,0 +1,49 @@
+"""Checks of migrate_export.py on a small export. Run with python3 -m pytest."""
+import csv
+import json
+
+from delta_state import DeltaState
+from migrate_export import run
+from quarantine import Quarantine
+
+def keys_record(serial):
+    version = {'KeysType': [None, {'ResolvedName': 'Tuner', 'Content': '1'}],
+               'Note': [None, {'Content': serial}]}
+    return json.dumps([None, {'Version': [None, version]}])
+
+def write_export(path, data_jsons):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_ALL)
+        writer.writerow(['class', 'name', 'cur_status', 'data_json'])
+        for data_json in data_jsons:
+            writer.writerow(['Keys', 'Tuner', 'Production', data_json])
+    return str(path)
+
+def delta_run(tmp_path, data_jsons):
+    # One --delta run: (stats of Keys, data rows of deletions.csv, quarantined)
+    source = write_export(tmp_path / 'export.csv', data_jsons)
+    delta = DeltaState(str(tmp_path / 'state.db'))
+    with Quarantine(str(tmp_path / 'quarantine.csv')) as quarantine:
+        run(source, str(tmp_path), {'Keys'}, use_index=False, delta=delta, quarantine=quarantine)
+    delta.close()
+    with open(tmp_path / 'deletions.csv', encoding='utf-8', newline='') as f:
+        deletions = list(csv.reader(f, delimiter=';'))[1:]
+    return delta.stats['Keys'], deletions, quarantine.total()
+
+def test_quarantined_rows_are_not_deleted(tmp_path):
+    records = [keys_record(f'S{n}') for n in range(3)]
+    stats, deletions, _ = delta_run(tmp_path, records)
+    assert stats['new'] == 3
+
+    broken = records[:1] + [records[1][:-10]] + records[2:]
+    stats, deletions, quarantined = delta_run(tmp_path, broken)
+    assert quarantined == 1
+    assert deletions == [] and stats == {'new': 0, 'changed': 0, 'unchanged': 2, 'deleted': 0}
+
+    # Fixed again, the record matches the row the state kept for it
+    stats, deletions, _ = delta_run(tmp_path, records)
+    assert deletions == [] and stats['unchanged'] == 3
+
+    # Really gone
+    stats, deletions, _ = delta_run(tmp_path, records[:2])
+    assert stats['deleted'] == 1 and [row[:2] for row in deletions] == [['Keys', 'Tuner']]
@@ -0,0 +1,16 @@
+"""Checks of query_export.py on a small export. Run with python3 -m pytest."""
+from export_columns import ColumnStore
+from query_export import group_by, parse_queries
+
+def test_collect_list_values(write_export):
+    source = write_export([
+        ('Tools', 'a', {'Group': {'Content': 'g1'}, 'Tags': {'Content': ['x', 'y']}}),
+        ('Tools', 'b', {'Group': {'Content': 'g1'}, 'Tags': {'Content': ['z']}}),
+        ('Tools', 'c', {'Group': {'Content': 'g2'}}),
+        ('MeasuringTools', 'd', {'Tags': {'Content': ['x', 'y']}}),
+    ])
+    store = ColumnStore.open(str(source))
+    by_group, by_class = parse_queries(['group-by', 'class=Tools', 'key=Group.Content', 'collect=Tags.Content',
+                                        'group-by', 'class=Tools,MeasuringTools', 'key=class', 'collect=Tags.Content'])
+    assert group_by(store, by_group) == {'g1': ['["x", "y"]', '["z"]'], 'g2': ['']}
+    assert group_by(store, by_class) == {'Tools': ['', '["x", "y"]', '["z"]'], 'MeasuringTools': ['["x", "y"]']}
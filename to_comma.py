@@ -1,16 +1,12 @@
-import csv
-import json
+# Superseded by csv_convert.py, which converts in blocks and can take many
+# files at once. Kept so the tools_safe_import.csv command still works.
+from cmdb_export import BASE_DIR
+from compressed import output_path
+from csv_convert import convert
 
-source_file = '/Users/sabyrzhanzhakipov/znuny-mount/tools_safe_import.csv'
-output_file = '/Users/sabyrzhanzhakipov/znuny-mount/tools_safe_comma.csv'
+source_file = output_path(f'{BASE_DIR}/tools_safe_import.csv')
+output_file = output_path(f'{BASE_DIR}/tools_safe_comma.csv')
 
-with open(source_file, 'r', encoding='utf-8') as f_in, \
-     open(output_file, 'w', encoding='utf-8', newline='') as f_out:
-    
-    reader = csv.reader(f_in, delimiter=';')
-    writer = csv.writer(f_out, delimiter=',')
-    
-    for row in reader:
-        writer.writerow(row)
+convert(source_file, output_file, ';', ',')
 
 print("Comma-separated version generated.")